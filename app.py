@@ -1,12 +1,36 @@
 # Updated 8/12/2025 - removing old operational cuts estimates, adding new fy26 cuts data
-import pdfkit
-import streamlit as st
-import pandas as pd
-import numpy as np
+import glob
+import hashlib
+import io
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
 
-# Add new imports for formatted tables
-import polars as pl
-from great_tables import GT, loc, style
+import stage_timing
+import startup_timing
+from startup_timing import timed_import
+
+# Timed so the startup-timing mode (CPS_STARTUP_TIMING=1) can report the cold import cost
+with timed_import("streamlit"):
+    import streamlit as st
+with timed_import("altair"):
+    import altair as alt
+with timed_import("pandas"):
+    import pandas as pd
+with timed_import("numpy"):
+    import numpy as np
+with timed_import("pyarrow"):
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+# Copy-on-Write (the default from pandas 3) lets every session share the cached frames:
+# anything a session derives and modifies gets its own copy instead of touching the shared data
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
 
 
 
@@ -50,6 +74,7 @@ def create_html_download(table, title):
 
 def create_formatted_tables(df_filtered, district_name):
     """Create formatted GT tables for HTML export"""
+    pl, GT, loc, style = load_report_stack()
     
     
     # Prepare capital data
@@ -180,685 +205,1950 @@ def create_formatted_tables(df_filtered, district_name):
     
     return operations_table, capital_table, cuts_table
 
-# Load data
-@st.cache_data
-def load_data():
-    """Load the CPS budget stakes dataset"""
+# Dataset location. The CSV is compiled once into an uncompressed Feather (Arrow IPC)
+# snapshot next to it, which later starts memory-map instead of re-parsing the CSV.
+DATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cps_budget_stakes_dataset_stacked_2025-06-23.csv")
+
+# Bump when the CSV parsing options change so existing snapshots get rebuilt
+SNAPSHOT_FORMAT_VERSION = 1
+SNAPSHOT_METADATA_KEY = b"cps_budget_stakes_source"
+
+
+def snapshot_path_for(csv_path):
+    """Path of the columnar snapshot that belongs to a CSV file"""
+    return os.path.splitext(csv_path)[0] + ".feather"
+
+
+def file_sha256(path):
+    """Content hash of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _read_snapshot_source(snapshot_path):
+    """Return the source fingerprint stored in a snapshot, or None if it is missing/unreadable"""
     try:
-        df = pd.read_csv(r"cps_budget_stakes_dataset_stacked_2025-06-23.csv")
-        return df
-    except FileNotFoundError:
-        st.error("Data file not found. Please ensure the CSV file is in the correct location.")
+        with pa.memory_map(snapshot_path, "r") as source:
+            metadata = pa.ipc.open_file(source).schema.metadata or {}
+        return json.loads(metadata[SNAPSHOT_METADATA_KEY])
+    except (OSError, KeyError, ValueError, pa.ArrowInvalid):
         return None
 
-# Main app
-def main():
-    st.title("🏫 CPS Budget Stakes Dashboard")
-    st.markdown("**Filter schools by legislative district to view capital needs and the impact of budget cuts**")
- 
- # Replace your entire st.markdown CSS block with this:
 
-    st.markdown("""
-    <style>
-    .stApp {
-        background-color: white !important;
-        color: black !important;
-    }
-    
-        /* FIX APP HEADER - MAKE WHITE ON MOBILE */
-    .stAppHeader {
-        background-color: white !important;
-        color: black !important;
-    }
-    
-    .stAppHeader > div {
-        background-color: white !important;
-        color: black !important;
+def _write_snapshot(table, snapshot_path, source_info):
+    """Atomically write a table plus its source fingerprint as an uncompressed Feather file"""
+    metadata = dict(table.schema.metadata or {})
+    metadata[SNAPSHOT_METADATA_KEY] = json.dumps(source_info).encode("utf-8")
+    table = table.replace_schema_metadata(metadata)
+    tmp_path = f"{snapshot_path}.{os.getpid()}.tmp"
+    try:
+        # Uncompressed so the file can be memory-mapped without decoding
+        feather.write_feather(table, tmp_path, compression="uncompressed")
+        os.replace(tmp_path, snapshot_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def load_snapshot(csv_path):
+    """Load a CSV through its columnar snapshot, rebuilding the snapshot when the CSV changes
+
+    The snapshot stores the CSV's size, mtime and sha256. A matching size/mtime is
+    trusted as-is; otherwise the CSV is hashed and only re-parsed if the content differs.
+    Returns (DataFrame, sha256 of the CSV).
+    """
+    stat = os.stat(csv_path)
+    source_info = {
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+    }
+    snapshot_path = snapshot_path_for(csv_path)
+    stored = _read_snapshot_source(snapshot_path)
+
+    if stored is not None and stored.get("format_version") == SNAPSHOT_FORMAT_VERSION:
+        if stored.get("size") == stat.st_size and stored.get("mtime_ns") == stat.st_mtime_ns:
+            table = feather.read_table(snapshot_path, memory_map=True)
+            return table.to_pandas(), stored["sha256"]
+
+        # File was touched (e.g. re-copied) - only rebuild if the content really changed
+        sha256 = file_sha256(csv_path)
+        if stored.get("sha256") == sha256:
+            table = feather.read_table(snapshot_path, memory_map=True)
+            try:
+                _write_snapshot(table, snapshot_path, {**source_info, "sha256": sha256})
+            except OSError:
+                pass
+            return table.to_pandas(), sha256
+    else:
+        sha256 = file_sha256(csv_path)
+
+    df = pd.read_csv(csv_path)
+    try:
+        _write_snapshot(pa.Table.from_pandas(df, preserve_index=False), snapshot_path, {**source_info, "sha256": sha256})
+    except OSError:
+        # Read-only deployments still work, they just parse the CSV on every cold start
+        pass
+    return df, sha256
+
+
+# Custom HTML tables. The header markup is everything emitted before the header cells.
+CAPITAL_TABLE_HEADER = """
+<style>
+.custom-table-capital {
+    border-collapse: collapse;
+    width: 100%;
+    font-family: 'Source Sans Pro', sans-serif;
+    font-size: 14px;
+    margin: 0 !important;
+}
+.custom-table-capital thead {
+    position: sticky;
+    top: 0;
+    z-index: 10;
+    background-color: white;
+}
+.custom-table-capital th {
+    background-color: white !important;
+    font-weight: bold !important;
+    text-align: center !important;
+    padding: 10px;
+    border: 1px solid #ddd;
+    color: black !important;
+    position: sticky;
+    top: 0;
+}
+.custom-table-capital td {
+    padding: 8px 10px;
+    border: 1px solid #ddd;
+    text-align: center;
+}
+.custom-table-capital td:first-child {
+    text-align: left;
+}
+.custom-table-capital tr:last-child {
+    background-color: #f0f0f0;
+    font-weight: bold;
+}
+</style>
+<div style="max-height: 400px; overflow-y: auto; border: 1px solid #ddd; width: 100%;">
+<table class="custom-table-capital">
+<thead><tr>
+"""
+
+CUTS_TABLE_HEADER = """
+<style>
+.custom-table {
+    border-collapse: collapse;
+    width: 100%;
+    font-family: 'Source Sans Pro', sans-serif;
+    font-size: 14px;
+    margin: 0 !important;
+}
+.custom-table thead {
+    position: sticky;
+    top: 0;
+    z-index: 10;
+    background-color: white;
+}
+.custom-table th {
+    background-color: white !important;
+    font-weight: bold !important;
+    text-align: center !important;
+    padding: 10px;
+    border: 1px solid #ddd;
+    color: black !important;
+    position: sticky;
+    top: 0;
+}
+.custom-table td {
+    padding: 8px 10px;
+    border: 1px solid #ddd;
+    text-align: center;
+}
+.custom-table td:first-child {
+    text-align: left;
+}
+.custom-table tr:last-child {
+    background-color: #f0f0f0;
+    font-weight: bold;
+}
+.cut2-column {
+    color: red !important;
+    font-weight: bold;
+}
+</style>
+<div style="max-height: 400px; overflow-y: auto; border: 1px solid #ddd; width: 100%;">
+<table class="custom-table">
+<thead><tr>
+"""
+
+# removed '% of CTU Positions'
+CUTS_HIGHLIGHT_COLUMNS = ['% of FY25 SPED Positions','% of FY25 Teachers', '% of FY25 Positions']
+
+
+def render_html_table(df, header, column_classes=None):
+    """Render a DataFrame as an HTML table, building each column's cells as one array
+
+    Every column is turned into its <td> strings in a single vectorized pass, the
+    columns are added together row-wise and the rows are joined once. With
+    column_classes every cell gets a class attribute (empty for unlisted columns).
+    The TOTAL row is the last row and is styled by the header's tr:last-child rule.
+    """
+    parts = [header]
+    parts.extend(f"<th>{col}</th>" for col in df.columns)
+    parts.append("</tr></thead><tbody>")
+    if len(df) > 0:
+        rows = np.full(len(df), "<tr>", dtype=object)
+        for col in df.columns:
+            if column_classes is None:
+                open_tag = "<td>"
+            else:
+                open_tag = f'<td class="{column_classes.get(col, "")}">'
+            rows = rows + open_tag + df[col].astype(str).to_numpy(dtype=object) + "</td>"
+        parts.append("</tr>".join(rows))
+        parts.append("</tr>")
+    parts.append("</tbody></table></div>")
+    return "".join(parts)
+
+
+def create_html_table_capital(df):
+    """Custom HTML table for the capital tab"""
+    return render_html_table(df, CAPITAL_TABLE_HEADER)
+
+
+def create_html_table_cuts(df):
+    """Custom HTML table for the cuts tab (positions as int, percentages as 0.00%)"""
+    return render_html_table(df, CUTS_TABLE_HEADER, column_classes={col: "cut2-column" for col in CUTS_HIGHLIGHT_COLUMNS})
+
+
+# Geography index: every filter mode resolves to a precomputed array of row positions
+GEOGRAPHY_KEYS = {
+    "district": ["Chamber", "District"],
+    "legislator": ["Legislator"],
+    "ward": ["Ward Number"],
+    "alderman": ["alderman"],
+}
+
+
+def _dedupe_positions(positions, school_ids):
+    """Keep the first row of each School ID, preserving row order"""
+    _, first = np.unique(school_ids[positions], return_index=True)
+    return positions[np.sort(first)]
+
+
+def build_geography_index(df):
+    """Map each (Chamber, District), Legislator, Ward Number and alderman to its row positions
+
+    Positions are already deduplicated by School ID (the stacked CSV repeats every
+    school once per chamber), so selecting a geography is a single take.
+    """
+    school_ids = df["School ID"].to_numpy()
+    index = {}
+    for kind, columns in GEOGRAPHY_KEYS.items():
+        groups = df.groupby(columns if len(columns) > 1 else columns[0], sort=False).indices
+        index[kind] = {key: _dedupe_positions(positions, school_ids) for key, positions in groups.items()}
+    return index
+
+
+def build_selector_catalog(df, index):
+    """Sorted sidebar choices for every filter mode plus the display label of each key
+
+    Labels come from the first (deduplicated) row of each geography, which is what
+    the subheaders and download names have always shown.
+    """
+    def first_value(kind, column):
+        values = df[column].to_numpy()
+        return {key: values[positions[0]] for key, positions in index[kind].items()}
+
+    chambers = df['Chamber'].to_numpy()
+    districts = df['District'].to_numpy()
+    legislator_chambers = first_value("legislator", 'Chamber')
+    legislator_districts = first_value("legislator", 'District')
+    return {
+        "chambers": sorted(df['Chamber'].unique()),
+        "districts": {chamber: sorted(pd.unique(districts[chambers == chamber])) for chamber in pd.unique(chambers)},
+        "legislators": sorted(df['Legislator'].dropna().unique()),
+        "wards": sorted(df['Ward Number'].dropna().unique()),
+        "aldermen": sorted(df['alderman'].dropna().unique()),
+        # Display labels
+        "district_legislator": first_value("district", 'Legislator'),
+        "legislator_district": {key: (legislator_chambers[key], legislator_districts[key]) for key in legislator_chambers},
+        "ward_alderman": first_value("ward", 'alderman'),
+        "alderman_ward": first_value("alderman", 'Ward Number'),
+        # Multi-geography choices: geography id -> label, districts then wards
+        "selection_labels": {
+            **{geography_id("district", key): f"{key[0]} District {key[1]}" for key in sorted(index["district"])},
+            **{geography_id("ward", key): f"Ward {key}" for key in sorted(index["ward"])},
+        },
     }
-    
-    /* Fix header text and elements */
-    .stAppHeader * {
-        background-color: white !important;
-        color: black !important;
+
+
+# Columns summed per geography for the metrics and TOTAL rows
+AGGREGATE_COLUMNS = [
+    'Immediate Capital Needs',
+    'Total Capital Needs',
+    'Total FY25',
+    'Position loss/gain (budgeted)',
+    'Total teachers FY25',
+    'Teacher positions loss/gain (budgeted)',
+    'Total SPED',
+    'SPED position loss/gain (budgeted)',
+    'Operational Budget FY25',
+    'Positions',
+    'SPED Positions',
+]
+
+# Percentages are recomputed from the summed columns (ratio of sums, not sum of ratios)
+AGGREGATE_PERCENTAGES = {
+    'Position loss/gain (% of FY25 positions)': ('Position loss/gain (budgeted)', 'Total FY25'),
+    'Teacher positions loss/gain (% of FY25)': ('Teacher positions loss/gain (budgeted)', 'Total teachers FY25'),
+    'SPED position loss/gain (% of FY25 SPED positions)': ('SPED position loss/gain (budgeted)', 'Total SPED'),
+}
+
+
+def build_geography_aggregates(df, index):
+    """One table per geography type with school counts, summed columns and recomputed percentages"""
+    # Transposed so each column is contiguous - summing a group then matches pandas' own
+    # column sums bit for bit, which keeps the TOTAL rows identical to the old per-rerun sums
+    values = np.ascontiguousarray(np.nan_to_num(df[AGGREGATE_COLUMNS].to_numpy(dtype=float)).T)
+    aggregates = {}
+    for kind, groups in index.items():
+        columns = GEOGRAPHY_KEYS[kind]
+        if len(columns) > 1:
+            keys = pd.MultiIndex.from_tuples(list(groups), names=columns)
+        else:
+            keys = pd.Index(list(groups), name=columns[0])
+        sums = np.array([values[:, positions].sum(axis=1) for positions in groups.values()]).reshape(len(groups), len(AGGREGATE_COLUMNS))
+        table = pd.DataFrame(sums, index=keys, columns=AGGREGATE_COLUMNS)
+        table.insert(0, "Schools", [len(positions) for positions in groups.values()])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for pct_col, (change_col, base_col) in AGGREGATE_PERCENTAGES.items():
+                table[pct_col] = np.abs(table[change_col].to_numpy() / table[base_col].to_numpy())
+        aggregates[kind] = table
+    return aggregates
+
+
+def empty_totals_row():
+    """Totals of a geography without schools"""
+    row = dict.fromkeys(["Schools"] + AGGREGATE_COLUMNS, 0)
+    row.update(dict.fromkeys(AGGREGATE_PERCENTAGES, np.nan))
+    return row
+
+
+def geography_totals(totals, kind, key):
+    """Totals of one geography (zeros if it has no schools)"""
+    row = totals[kind].get(key)
+    if row is None:
+        row = empty_totals_row()
+    return row
+
+
+# Format currency and numbers functions
+def format_currency(val):
+    if pd.isna(val):
+        return ""
+    return f"${val:,.0f}"
+
+
+def format_positions(val):
+    if pd.isna(val):
+        return ""
+    return f"{val:.1f}"
+
+
+# Display formats of the table columns. They are applied to every row and every
+# geography's totals once at load time, so rendering only slices strings.
+DISPLAY_FORMATS = {
+    'Immediate Capital Needs': format_currency,
+    'Total Capital Needs': format_currency,
+    'Position loss/gain (budgeted)': lambda x: f"{int(x):,}",
+    'Position loss/gain (% of FY25 positions)': lambda x: f"{x:.2%}",
+    'Teacher positions loss/gain (budgeted)': lambda x: f"{int(x):,}",
+    'Teacher positions loss/gain (% of FY25)': lambda x: f"{x:.2%}",
+    'SPED position loss/gain (budgeted)': lambda x: f"{int(x):,}",
+    'SPED position loss/gain (% of FY25 SPED positions)': lambda x: f"{x:.2%}",
+}
+
+# Capital tab columns and their display names
+CAPITAL_DISPLAY_COLUMNS = {
+    'School Name': "School Name",
+    'Immediate Capital Needs': "Immediate (within 5 years)",
+    'Total Capital Needs': "Total Capital Needs",
+}
+
+# REMOVED CTU layoff (8/11/25): 'CTU layoffs (budgeted)', 'CTU layoffs (% of CTU positions)'
+CUTS_DISPLAY_COLUMNS = [
+    'School Name',
+    'Position loss/gain (budgeted)',
+    'Position loss/gain (% of FY25 positions)',
+    'Teacher positions loss/gain (budgeted)',
+    'Teacher positions loss/gain (% of FY25)',
+    'SPED position loss/gain (budgeted)',
+    'SPED position loss/gain (% of FY25 SPED positions)',
+]
+
+
+def format_values(values, formatter):
+    """Format a numeric array, calling the formatter once per distinct value; NaN becomes """""
+    values = np.asarray(values, dtype=float)
+    formatted = np.full(len(values), "", dtype=object)
+    present = ~np.isnan(values)
+    distinct, inverse = np.unique(values[present], return_inverse=True)
+    formatted[present] = np.array([formatter(value) for value in distinct], dtype=object)[inverse]
+    return formatted
+
+
+def build_display_columns(df):
+    """Pre-formatted string columns for every row, aligned with df"""
+    columns = {'School Name': df['School Name'].to_numpy(dtype=object)}
+    for col, formatter in DISPLAY_FORMATS.items():
+        columns[col] = format_values(df[col].to_numpy(dtype=float), formatter)
+    return pd.DataFrame(columns, index=df.index)
+
+
+def build_display_totals(aggregates):
+    """Pre-formatted TOTAL row values as {kind: {key: {column: string}}}"""
+    display_totals = {}
+    for kind, table in aggregates.items():
+        formatted = pd.DataFrame(
+            {col: format_values(table[col].to_numpy(dtype=float), formatter) for col, formatter in DISPLAY_FORMATS.items()},
+            index=table.index,
+        )
+        display_totals[kind] = formatted.to_dict("index")
+    return display_totals
+
+
+def geography_display_totals(display_totals, kind, key):
+    """Formatted totals of one geography"""
+    row = display_totals[kind].get(key)
+    if row is None:
+        empty = empty_totals_row()
+        row = {col: format_values([empty[col]], formatter)[0] for col, formatter in DISPLAY_FORMATS.items()}
+    return row
+
+
+# Multi-geography selections. Every district and ward has a membership bitset over the
+# unique School IDs, so unions and intersections are bit operations and a school that
+# appears in several selected geographies (or in both chambers' rows) is counted once.
+SELECTION_OPERATIONS = {
+    "union": np.bitwise_or,
+    "intersection": np.bitwise_and,
+}
+SELECTION_KINDS = ("district", "ward")
+EMPTY_POSITIONS = np.empty(0, dtype=np.intp)
+
+
+def build_school_bitsets(df, index):
+    """First row position of each unique School ID plus a packed membership bitset per district and ward"""
+    codes, school_ids = pd.factorize(df["School ID"])
+    _, first_rows = np.unique(codes, return_index=True)
+    bitsets = {}
+    for kind in SELECTION_KINDS:
+        for key, positions in index[kind].items():
+            members = np.zeros(len(school_ids), dtype=bool)
+            members[codes[positions]] = True
+            bitsets[geography_id(kind, key)] = np.packbits(members)
+    return {"rows": first_rows, "codes": codes, "bitsets": bitsets}
+
+
+def selection_positions(schools, operation, geo_ids):
+    """Row positions (one per school, in dataset order) of the union or intersection of geographies"""
+    if not geo_ids:
+        return EMPTY_POSITIONS
+    combined = SELECTION_OPERATIONS[operation].reduce([schools["bitsets"][geo_id] for geo_id in geo_ids])
+    members = np.unpackbits(combined, count=len(schools["rows"])).astype(bool)
+    return schools["rows"][members]
+
+
+def aggregate_positions(df, positions):
+    """Totals of arbitrary rows, computed like build_geography_aggregates"""
+    sums = np.nan_to_num(df[AGGREGATE_COLUMNS].to_numpy(dtype=float)[positions]).sum(axis=0)
+    row = {"Schools": len(positions), **dict(zip(AGGREGATE_COLUMNS, sums))}
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for pct_col, (change_col, base_col) in AGGREGATE_PERCENTAGES.items():
+            row[pct_col] = np.abs(np.float64(row[change_col]) / row[base_col])
+    return row
+
+
+def geography_positions(dataset, geo_kind, geo_key):
+    """Row positions of a geography, or of a ("selection", (operation, geography ids)) selection"""
+    if geo_kind == "selection":
+        return selection_positions(dataset["schools"], *geo_key)
+    return dataset["index"][geo_kind].get(geo_key, EMPTY_POSITIONS)
+
+
+def dataset_geography_totals(dataset, geo_kind, geo_key):
+    """Totals of a geography or selection"""
+    if geo_kind == "selection":
+        return aggregate_positions(dataset["df"], geography_positions(dataset, geo_kind, geo_key))
+    return geography_totals(dataset["totals"], geo_kind, geo_key)
+
+
+def dataset_geography_display_totals(dataset, geo_kind, geo_key):
+    """Formatted totals of a geography or selection"""
+    if geo_kind == "selection":
+        totals = dataset_geography_totals(dataset, geo_kind, geo_key)
+        return {col: format_values([totals[col]], formatter)[0] for col, formatter in DISPLAY_FORMATS.items()}
+    return geography_display_totals(dataset["display_totals"], geo_kind, geo_key)
+
+
+# District x ward overlap, stored sparsely: one row per (district, ward) pair that shares
+# schools, plus the row positions of each district's and each ward's pairs so the
+# overlap panel is a dictionary lookup and a take.
+OVERLAP_COLUMNS = [
+    'Immediate Capital Needs',
+    'Total Capital Needs',
+    'Position loss/gain (budgeted)',
+]
+
+
+def build_overlap_matrix(df, index):
+    """{"table": (district, ward) pairs with shared school counts and sums, "district"/"ward": {key: pair positions}}"""
+    district_positions = list(index["district"].values())
+    positions = np.concatenate(district_positions)
+    district_codes = np.repeat(np.arange(len(district_positions)), [len(p) for p in district_positions])
+    ward_codes, wards = pd.factorize(df["Ward Number"].to_numpy()[positions])
+
+    # District positions are deduplicated by School ID and every school has one ward,
+    # so each (district, school) row counts once towards exactly one pair
+    present = ward_codes >= 0
+    pairs, inverse = np.unique(district_codes[present] * len(wards) + ward_codes[present], return_inverse=True)
+    values = np.nan_to_num(df[OVERLAP_COLUMNS].to_numpy(dtype=float)[positions[present]])
+    sums = np.zeros((len(pairs), len(OVERLAP_COLUMNS)))
+    np.add.at(sums, inverse, values)
+
+    district_keys = list(index["district"])
+    table = pd.DataFrame(
+        [district_keys[code] for code in pairs // len(wards)], columns=GEOGRAPHY_KEYS["district"]
+    )
+    table["Ward Number"] = wards[pairs % len(wards)]
+    table["Schools"] = np.bincount(inverse, minlength=len(pairs))
+    table[OVERLAP_COLUMNS] = sums
+    return {
+        "table": table,
+        "district": table.groupby(GEOGRAPHY_KEYS["district"], sort=False).indices,
+        "ward": table.groupby("Ward Number", sort=False).indices,
     }
-    
-    /* Target header specifically for mobile */
-    [data-testid="stHeader"] {
-        background-color: white !important;
-        color: black !important;
+
+
+def overlap_rows(dataset, geo_kind, geo_key):
+    """Formatted overlap panel of a selection: its wards for a district or legislator, its districts for a
+    ward or alder, most shared schools first (None for multi-geography selections)"""
+    catalog = dataset["catalog"]
+    if geo_kind == "legislator":
+        geo_kind, geo_key = "district", catalog["legislator_district"][geo_key]
+    elif geo_kind == "alderman":
+        geo_kind, geo_key = "ward", catalog["alderman_ward"][geo_key]
+    elif geo_kind == "selection":
+        return None
+    overlap = dataset["overlap"]
+    rows = overlap["table"].take(overlap[geo_kind].get(geo_key, EMPTY_POSITIONS))
+    rows = rows.sort_values("Schools", ascending=False, kind="stable")
+
+    if geo_kind == "district":
+        panel = pd.DataFrame({
+            "Ward": rows["Ward Number"].to_numpy(),
+            "Alder": [catalog["ward_alderman"][ward] for ward in rows["Ward Number"]],
+        })
+    else:
+        keys = list(zip(rows["Chamber"], rows["District"]))
+        panel = pd.DataFrame({
+            "Chamber": rows["Chamber"].to_numpy(),
+            "District": rows["District"].to_numpy(),
+            "Legislator": [catalog["district_legislator"][key] for key in keys],
+        })
+    panel["Shared Schools"] = rows["Schools"].to_numpy()
+    for col in OVERLAP_COLUMNS:
+        panel[col] = format_values(rows[col].to_numpy(), DISPLAY_FORMATS[col])
+    return panel
+
+
+# School search. Names are indexed by trigram (and by the first one or two letters of
+# each word for short queries), IDs by sorted prefix, and every school carries its
+# House district, Senate district, ward and alder, so a query never scans the DataFrame.
+SEARCH_GRAM = 3
+SEARCH_LIMIT = 25
+SEARCH_RESULT_COLUMNS = ['Immediate Capital Needs', 'Total Capital Needs', 'Position loss/gain (budgeted)']
+
+
+def normalize_search_text(text):
+    """Lowercase, with every run of non-alphanumeric characters turned into one space"""
+    return " ".join(re.sub(r"[^0-9a-z]+", " ", str(text).lower()).split())
+
+
+def build_search_index(df, schools):
+    """Name n-gram and ID prefix indexes over the unique schools plus one result row per school"""
+    rows = schools["rows"]
+    names = [normalize_search_text(name) for name in df["School Name"].to_numpy()[rows]]
+    ids = df["School ID"].astype(str).to_numpy()[rows]
+
+    grams, prefixes = {}, {}
+    for school, name in enumerate(names):
+        for gram in {name[i:i + SEARCH_GRAM] for i in range(len(name) - SEARCH_GRAM + 1)}:
+            grams.setdefault(gram, []).append(school)
+        for prefix in {word[:n] for word in name.split() for n in range(1, SEARCH_GRAM)}:
+            prefixes.setdefault(prefix, []).append(school)
+
+    # Reverse index: every geography of each school (one House and one Senate row per school)
+    codes = schools["codes"]
+    results = pd.DataFrame({"School Name": df["School Name"].to_numpy()[rows], "School ID": ids})
+    for chamber in ("IL House", "IL Senate"):
+        chamber_rows = np.flatnonzero(df["Chamber"].to_numpy() == chamber)
+        district = np.full(len(rows), "", dtype=object)
+        district[codes[chamber_rows]] = [
+            f"{d} ({legislator})" for d, legislator in zip(df["District"].to_numpy()[chamber_rows], df["Legislator"].to_numpy()[chamber_rows])
+        ]
+        results[chamber] = district
+    results["Ward"] = df["Ward Number"].to_numpy()[rows]
+    results["Alder"] = df["alderman"].to_numpy()[rows]
+    for col in SEARCH_RESULT_COLUMNS:
+        results[col] = format_values(df[col].to_numpy(dtype=float)[rows], DISPLAY_FORMATS[col])
+
+    id_order = np.argsort(ids, kind="stable")
+    return {
+        "names": names,
+        "rank": np.argsort(np.argsort(names, kind="stable")),
+        "grams": {gram: np.array(found, dtype=np.intp) for gram, found in grams.items()},
+        "prefixes": {prefix: np.array(found, dtype=np.intp) for prefix, found in prefixes.items()},
+        "id_order": id_order,
+        "id_sorted": ids[id_order],
+        "results": results,
     }
-    
-    [data-testid="stHeader"] > div {
-        background-color: white !important;
-        color: black !important;
+
+
+def search_schools(search, query, limit=SEARCH_LIMIT):
+    """Ordinals of the schools whose name contains the query or whose School ID starts with it, names starting with it first
+
+    Queries shorter than a trigram match the start of any word of the name.
+    """
+    text = normalize_search_text(query)
+    if not text:
+        return EMPTY_POSITIONS
+
+    # School ID prefix: a binary search over the sorted IDs
+    matches = []
+    if text.isdigit():
+        lo, hi = np.searchsorted(search["id_sorted"], [text, text + "\x7f"])
+        matches.append(search["id_order"][lo:hi])
+
+    # Name: intersect the posting lists of the query's grams, then confirm the substring
+    if len(text) < SEARCH_GRAM:
+        candidates = search["prefixes"].get(text, EMPTY_POSITIONS)
+    else:
+        postings = sorted(
+            (search["grams"].get(text[i:i + SEARCH_GRAM], EMPTY_POSITIONS) for i in range(len(text) - SEARCH_GRAM + 1)),
+            key=len,
+        )
+        candidates = postings[0]
+        for posting in postings[1:]:
+            if len(candidates) == 0:
+                break
+            candidates = np.intersect1d(candidates, posting, assume_unique=True)
+        names = search["names"]
+        candidates = np.array([school for school in candidates if text in names[school]], dtype=np.intp)
+    matches.append(candidates)
+
+    found = np.unique(np.concatenate(matches))
+    names = search["names"]
+    starts = np.array([not names[school].startswith(text) for school in found], dtype=bool)
+    return found[np.lexsort((search["rank"][found], starts))][:limit]
+
+
+def search_results(search, found):
+    """Result rows (name, ID, geographies and key figures) of the schools found by search_schools"""
+    return search["results"].take(found)
+
+
+# Ingest validation. Every check runs vectorized once per dataset version; the report is
+# plain JSON-serializable data kept with the dataset and shown in the admin panel.
+VALIDATION_STATUSES = ("ok", "warning", "error")
+VALIDATION_EXAMPLES = 5
+VALIDATION_TOLERANCE = 1e-4
+
+# Percentage column -> (change column, baseline column); expected pct == abs(change) / baseline
+VALIDATION_RATIOS = {
+    'Position loss/gain (% of FY25 positions)': ('Position loss/gain (budgeted)', 'Total FY25'),
+    'CTU layoffs (% of CTU positions)': ('CTU layoffs (budgeted)', 'Total CTU'),
+    'SPED position loss/gain (% of FY25 SPED positions)': ('SPED position loss/gain (budgeted)', 'Total SPED'),
+    'Teacher positions loss/gain (% of FY25)': ('Teacher positions loss/gain (budgeted)', 'Total teachers FY25'),
+    'Lead coach positions loss/gain (% of FY25)': ('Lead coach positions loss/gain (budgeted)', 'Total lead coaches FY25'),
+    'Lunchroom staff loss/gain (% of FY25)': ('Lunchroom staff loss/gain (budgeted)', 'Lunchroom staff FY25'),
+    'Security positions loss/gain (% of FY25)': ('Security positions loss/gain (budgeted)', 'Security positions FY25'),
+}
+
+# Precomputed cut column -> (base column, rate)
+VALIDATION_CUTS = {
+    f"{prefix} {rate}% Cut": (base_col, rate / 100)
+    for base_col, prefix in [('Operational Budget FY25', "Operations"), ('Positions', "Positions"), ('SPED Positions', "SPED Positions")]
+    for rate in (7, 15)
+}
+
+# Duplicated key columns that must agree wherever the second one is present
+VALIDATION_DUPLICATE_KEYS = {
+    'School_ID': 'School ID',
+    'ward': 'Ward Number',
+}
+
+# Columns every row needs for the geography index, selectors and labels
+VALIDATION_REQUIRED = ['School ID', 'School Name', 'Chamber', 'District', 'Legislator', 'Ward Number', 'alderman']
+
+# School attributes that must be identical on each school's House and Senate rows
+VALIDATION_SCHOOL_COLUMNS = ['School Name', 'Ward Number', 'alderman', *AGGREGATE_COLUMNS]
+
+
+def _validation_check(name, failing, school_ids, detail, status="error"):
+    """One check result; failing is a boolean mask over the rows (or over the schools)"""
+    failures = int(np.count_nonzero(failing))
+    return {
+        "check": name,
+        "status": status if failures else "ok",
+        "failures": failures,
+        "detail": detail,
+        "examples": [str(school_id) for school_id in pd.unique(school_ids[failing])[:VALIDATION_EXAMPLES]],
     }
-    
-        /* TARGET MAIN CONTENT AREA SPECIFICALLY - RESPONSIVE */
-    .main .block-container {
-        padding-left: 4rem !important;
-        padding-right: 4rem !important;
-        max-width: none !important;
-        width: 100% !important;
+
+
+def _missing_columns_check(name, columns, df):
+    """Check result for a check skipped because its columns are missing; None if all are present"""
+    missing = [col for col in columns if col not in df.columns]
+    if not missing:
+        return None
+    return {
+        "check": f"missing columns: {name}",
+        "status": "warning",
+        "failures": len(missing),
+        "detail": "check skipped, columns not in the file",
+        "examples": missing[:VALIDATION_EXAMPLES],
     }
-    
-    /* Use stMain to target main content - DESKTOP */
-    .stMain .block-container {
-        padding-left: 6rem !important;
-        padding-right: 6rem !important;
-        max-width: none !important;
+
+
+def validate_dataset(df, index, catalog, sha256):
+    """Integrity report of a dataset version: ratio consistency, duplicate keys, NaN coverage and empty geographies
+
+    Checks of optional columns (retired CTU columns, fixed cut columns, duplicate
+    keys) that are missing from the file are skipped and reported as warnings.
+    """
+    school_ids = df["School ID"].to_numpy()
+    checks = []
+
+    for pct_col, (change_col, base_col) in VALIDATION_RATIOS.items():
+        missing = _missing_columns_check(f"ratio: {pct_col}", [pct_col, change_col, base_col], df)
+        if missing is not None:
+            checks.append(missing)
+            continue
+        pct = df[pct_col].to_numpy(dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            expected = np.abs(df[change_col].to_numpy(dtype=float) / df[base_col].to_numpy(dtype=float))
+        comparable = ~np.isnan(pct) & np.isfinite(expected)
+        mismatched = comparable & ~np.isclose(pct, np.where(comparable, expected, 0), atol=VALIDATION_TOLERANCE)
+        checks.append(_validation_check(f"ratio: {pct_col}", mismatched, school_ids,
+                                        f"!= abs({change_col}) / {base_col}"))
+
+    for cut_col, (base_col, rate) in VALIDATION_CUTS.items():
+        missing = _missing_columns_check(f"ratio: {cut_col}", [cut_col, base_col], df)
+        if missing is not None:
+            checks.append(missing)
+            continue
+        cut = df[cut_col].to_numpy(dtype=float)
+        expected = df[base_col].to_numpy(dtype=float) * rate
+        mismatched = ~np.isclose(cut, expected, equal_nan=True)
+        checks.append(_validation_check(f"ratio: {cut_col}", mismatched, school_ids, f"!= {base_col} x {rate:g}"))
+
+    for duplicate_col, key_col in VALIDATION_DUPLICATE_KEYS.items():
+        missing = _missing_columns_check(f"duplicate key: {duplicate_col}", [duplicate_col, key_col], df)
+        if missing is not None:
+            checks.append(missing)
+            continue
+        duplicate = df[duplicate_col]
+        present = duplicate.notna().to_numpy()
+        disagree = present & (duplicate.to_numpy() != df[key_col].to_numpy())
+        checks.append(_validation_check(f"duplicate key: {duplicate_col}", disagree, school_ids,
+                                        f"differs from {key_col} ({int((~present).sum())} rows blank)"))
+
+    missing = df[VALIDATION_REQUIRED].isna().to_numpy()
+    checks.append(_validation_check("required columns", missing.any(axis=1), school_ids,
+                                    "rows missing " + ", ".join(np.array(VALIDATION_REQUIRED)[missing.any(axis=0)]) if missing.any() else "none missing"))
+
+    # The stacked CSV repeats every school once per chamber; the repeats must agree
+    codes, unique_ids = pd.factorize(df["School ID"])
+    chamber_rows = np.zeros((len(unique_ids), 2), dtype=np.intp)
+    for i, chamber in enumerate(("IL House", "IL Senate")):
+        np.add.at(chamber_rows[:, i], codes[df["Chamber"].to_numpy() == chamber], 1)
+    checks.append(_validation_check("one House and one Senate row per school", (chamber_rows != 1).any(axis=1),
+                                    unique_ids.to_numpy(), "schools with a missing or repeated chamber row", status="warning"))
+    _, first_rows = np.unique(codes, return_index=True)
+    first = df[VALIDATION_SCHOOL_COLUMNS].take(first_rows[codes]).reset_index(drop=True)
+    rows = df[VALIDATION_SCHOOL_COLUMNS].reset_index(drop=True)
+    differs = (rows != first) & ~(rows.isna() & first.isna())
+    checks.append(_validation_check("school rows agree across chambers", differs.to_numpy().any(axis=1), school_ids,
+                                    "columns differing: " + ", ".join(differs.columns[differs.any()]) if differs.any().any() else "all agree"))
+
+    # Every sidebar choice must resolve to at least one school
+    choices = {
+        "district": [(chamber, district) for chamber, districts in catalog["districts"].items() for district in districts],
+        "legislator": catalog["legislators"],
+        "ward": catalog["wards"],
+        "alderman": catalog["aldermen"],
+    }
+    empty = [geography_id(kind, key) for kind, keys in choices.items() for key in keys if len(index[kind].get(key, ())) == 0]
+    checks.append({
+        "check": "empty geographies",
+        "status": "warning" if empty else "ok",
+        "failures": len(empty),
+        "detail": "sidebar choices without schools",
+        "examples": empty[:VALIDATION_EXAMPLES],
+    })
+
+    return {
+        "dataset_hash": sha256,
+        "rows": len(df),
+        "schools": len(unique_ids),
+        "status": max((check["status"] for check in checks), key=VALIDATION_STATUSES.index),
+        "checks": checks,
+        "nan_coverage": {col: round(float(share), 4) for col, share in df.isna().mean().items() if share > 0},
     }
-    
-    /* MOBILE RESPONSIVE - Reduce padding on small screens */
-    @media (max-width: 768px) {
-        .main .block-container {
-            padding-left: 1rem !important;
-            padding-right: 1rem !important;
+
+
+def show_validation_report(report):
+    """Sidebar admin panel with the dataset's integrity report (?admin=1 or CPS_ADMIN_PANEL=1)"""
+    icons = {"ok": "✅", "warning": "⚠️", "error": "❌"}
+    with st.sidebar.expander(f"{icons[report['status']]} Data validation"):
+        st.markdown(f"**Dataset version:** `{report['dataset_hash'][:12]}` ({report['rows']:,} rows, {report['schools']:,} schools)")
+        for check in report["checks"]:
+            line = f"{icons[check['status']]} **{check['check']}**"
+            if check["failures"]:
+                line += f": {check['failures']:,} ({check['detail']}; e.g. {', '.join(check['examples'])})"
+            st.markdown(line)
+        st.download_button(
+            label="⬇️ Download Validation Report (JSON)",
+            data=json.dumps(report, indent=1),
+            file_name=f"validation_{report['dataset_hash'][:12]}.json",
+            mime="application/json",
+        )
+
+
+# Shared dataset. Built once per process with st.cache_resource and handed to every
+# session as the same object, so memory does not grow with the number of sessions.
+def _freeze_frame(df):
+    """Mark the numpy buffers behind a DataFrame read-only"""
+    for col in df.columns:
+        values = df[col].to_numpy()
+        while isinstance(values, np.ndarray):
+            values.flags.writeable = False
+            values = values.base
+
+
+def _freeze_arrays(value):
+    """Mark every numpy array inside nested dicts read-only"""
+    if isinstance(value, np.ndarray):
+        value.flags.writeable = False
+    elif isinstance(value, dict):
+        for item in value.values():
+            _freeze_arrays(item)
+
+
+def build_dataset(df, sha256):
+    """The dataset plus every structure the dashboard derives from it"""
+    index = build_geography_index(df)
+    aggregates = build_geography_aggregates(df, index)
+    dataset = {
+        "hash": sha256,
+        "df": df,
+        "index": index,
+        "catalog": build_selector_catalog(df, index),
+        "aggregates": aggregates,
+        "totals": {kind: table.to_dict("index") for kind, table in aggregates.items()},
+        "display": build_display_columns(df),
+        "display_totals": build_display_totals(aggregates),
+        "scenario_base": scenario_base_values(df),
+        "sensitivity": build_sensitivity_cube(aggregates),
+        "schools": build_school_bitsets(df, index),
+        "overlap": build_overlap_matrix(df, index),
+    }
+    dataset["search"] = build_search_index(df, dataset["schools"])
+    dataset["validation"] = validate_dataset(df, index, dataset["catalog"], sha256)
+    dataset["leaderboards"] = build_leaderboards(aggregates, dataset["catalog"])
+    leaderboard_tables = [board["table"] for board in dataset["leaderboards"].values()]
+    frames = [dataset["df"], dataset["display"], dataset["overlap"]["table"], dataset["search"]["results"],
+              *aggregates.values(), *leaderboard_tables]
+    for frame in frames:
+        _freeze_frame(frame)
+    _freeze_arrays(index)
+    _freeze_arrays(dataset["scenario_base"])
+    _freeze_arrays(dataset["sensitivity"])
+    _freeze_arrays(dataset["schools"])
+    _freeze_arrays(dataset["overlap"])
+    _freeze_arrays({key: value for key, value in dataset["search"].items() if key != "results"})
+    _freeze_arrays({group: board["orders"] for group, board in dataset["leaderboards"].items()})
+    return dataset
+
+
+# Hot reload. The newest dataset CSV in the data directory is polled in the background;
+# when its content hash changes the new dataset is built off the request path and
+# swapped in whole, so every rerun sees either the old or the new version. All derived
+# caches are keyed by the dataset hash and are cleared only when the hash changes.
+DATA_DIR = os.environ.get("CPS_DATA_DIR", os.path.dirname(DATA_FILE))
+DATA_FILE_PATTERN = os.environ.get("CPS_DATA_PATTERN", "cps_budget_stakes_dataset*.csv")
+DATA_POLL_SECONDS = float(os.environ.get("CPS_DATA_POLL_SECONDS", "10"))
+
+
+def find_data_file(data_dir=DATA_DIR, pattern=DATA_FILE_PATTERN):
+    """Most recently modified dataset CSV in the data directory"""
+    paths = glob.glob(os.path.join(data_dir, pattern))
+    if not paths:
+        raise FileNotFoundError(os.path.join(data_dir, pattern))
+    return max(paths, key=lambda path: (os.stat(path).st_mtime_ns, path))
+
+
+class DatasetManager:
+    """The current dataset of the process, swapped for a new one when the data directory changes
+
+    A file is only loaded once the same (path, size, mtime) has been seen on two
+    consecutive polls, so a CSV that is still being copied in is not picked up half
+    written. A touched file with unchanged content is not rebuilt (its hash comes
+    from load_snapshot, which trusts a known size/mtime). Failed reloads keep the
+    current dataset and are reported in last_error until a later refresh succeeds
+    or finds the current content again; the same broken file is not retried.
+    """
+
+    def __init__(self, data_dir=DATA_DIR, pattern=DATA_FILE_PATTERN, poll_seconds=DATA_POLL_SECONDS, on_swap=()):
+        self.data_dir = data_dir
+        self.pattern = pattern
+        self.poll_seconds = poll_seconds
+        self.on_swap = list(on_swap)
+        self.dataset = None
+        self.path = None
+        self.loaded_at = None
+        self.reloads = 0
+        self.last_error = None
+        self._signature = None
+        self._pending = None
+        self._lock = threading.Lock()
+        self.refresh(wait_stable=False)
+        if poll_seconds > 0:
+            threading.Thread(target=self._watch, name="cps-dataset-watch", daemon=True).start()
+
+    def current(self):
+        return self.dataset
+
+    def refresh(self, wait_stable=True):
+        """Swap in the newest data file if its content changed; returns True if it did"""
+        with self._lock:
+            path = find_data_file(self.data_dir, self.pattern)
+            stat = os.stat(path)
+            signature = (path, stat.st_size, stat.st_mtime_ns)
+            if signature == self._signature:
+                return False
+            if wait_stable and signature != self._pending:
+                self._pending = signature
+                return False
+
+            try:
+                df, sha256 = load_snapshot(path)
+                unchanged = self.dataset is not None and sha256 == self.dataset["hash"]
+                dataset = None if unchanged else build_dataset(df, sha256)
+            except Exception:
+                # Not retried until the file changes again
+                self._signature = signature
+                raise
+            self._signature = signature
+            # Also clears the error of a broken newer file that has since been removed
+            self.last_error = None
+            if unchanged:
+                self.path = path
+                return False
+
+            # A single reference assignment: a rerun that already holds the old dataset finishes with it
+            replaced = self.dataset is not None
+            self.dataset = dataset
+            self.path = path
+            self.loaded_at = time.time()
+        if replaced:
+            self.reloads += 1
+            for callback in self.on_swap:
+                callback()
+        return True
+
+    def _watch(self):
+        while True:
+            time.sleep(self.poll_seconds)
+            try:
+                self.refresh()
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+
+
+@st.cache_resource
+def get_dataset_manager():
+    """One dataset manager (and watcher thread) per process"""
+    return DatasetManager(on_swap=[get_view_cache().clear, get_scenario_cache().clear,
+                                   get_sensitivity_cache().clear, get_export_cache().clear])
+
+
+def load_dataset():
+    """Current dataset of the process; all sessions share the read-only result"""
+    return get_dataset_manager().current()
+
+
+def show_startup_timing(timings):
+    """Sidebar panel with cold import times and time to first render (?startup=1 or CPS_STARTUP_TIMING=1)"""
+    with st.sidebar.expander("⏱️ Startup timing"):
+        if timings["first_render_seconds"] is not None:
+            st.markdown(f"**Time to first render:** {timings['first_render_seconds']:.2f}s (from the first script run)")
+        for module, seconds in sorted(timings["imports"].items(), key=lambda item: -item[1]):
+            st.markdown(f"**{module}:** {seconds * 1000:,.0f} ms")
+        if "great_tables" not in timings["imports"]:
+            st.markdown("polars and great_tables load on the first report")
+
+
+def show_stage_timing(rows):
+    """Sidebar debug panel with per-stage timings of recent reruns (?debug=1 or CPS_STAGE_TIMING=1)"""
+    with st.sidebar.expander("🐞 Stage timing"):
+        if not rows:
+            st.markdown("No samples yet")
+            return
+        st.markdown(f"Latest {stage_timing.WINDOW} samples per stage and filter mode. View stages "
+                    "(filter, totals, format, html) only run on a view cache miss.")
+        st.dataframe(
+            pd.DataFrame(rows).drop(columns="histogram").round(2),
+            hide_index=True,
+        )
+        stage = st.selectbox("Histogram of:", list(dict.fromkeys(row["stage"] for row in rows)))
+        labels = stage_timing.bucket_labels()
+        histogram = pd.DataFrame([
+            {"mode": row["mode"], "bucket": label, "order": i, "count": count}
+            for row in rows if row["stage"] == stage and row["mode"] != "all"
+            for i, (label, count) in enumerate(zip(labels, row["histogram"])) if count
+        ])
+        st.altair_chart(
+            alt.Chart(histogram).mark_bar().encode(
+                x=alt.X("bucket:N", sort=alt.SortField("order"), title=None),
+                y=alt.Y("count:Q", title="Samples"),
+                color=alt.Color("mode:N", title="Filter mode"),
+                tooltip=["mode", "bucket", "count"],
+            ),
+            width="stretch",
+        )
+
+
+def show_dataset_status(manager):
+    """Sidebar admin panel with the data source and hot-reload state"""
+    with st.sidebar.expander("🔄 Data source"):
+        st.markdown(f"**File:** `{os.path.basename(manager.path)}` (version `{manager.dataset['hash'][:12]}`)")
+        st.markdown(f"**Loaded:** {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(manager.loaded_at))}, "
+                    f"{manager.reloads} reload(s) since start")
+        if manager.poll_seconds > 0:
+            st.markdown(f"**Watching:** `{manager.data_dir}` every {manager.poll_seconds:g}s")
+        else:
+            st.markdown("**Watching:** off (CPS_DATA_POLL_SECONDS=0)")
+        if manager.last_error:
+            st.error(f"Last reload failed: {manager.last_error}")
+
+
+# Load data
+def load_data():
+    """Load the CPS budget stakes dataset"""
+    try:
+        return load_dataset()
+    except FileNotFoundError:
+        st.error("Data file not found. Please ensure the CSV file is in the correct location.")
+        return None
+
+
+TRUTHY_VALUES = ("1", "true", "yes", "on")
+
+
+def env_flag(env_var):
+    """True if an environment variable is set to 1/true/yes/on"""
+    return os.environ.get(env_var, "").strip().lower() in TRUTHY_VALUES
+
+
+def option_enabled(query_param, env_var):
+    """True if an opt-in mode is switched on with ?<query_param>=1 or the <env_var> environment variable"""
+    if env_flag(env_var):
+        return True
+    return str(st.query_params.get(query_param, "")).strip().lower() in TRUTHY_VALUES
+
+
+def dataset_memory_bytes(dataset):
+    """Bytes held by the shared dataset and its derived frames and arrays"""
+    frames = [dataset["df"], dataset["display"], dataset["overlap"]["table"], *dataset["aggregates"].values()]
+    total = sum(int(frame.memory_usage(index=True, deep=True).sum()) for frame in frames)
+    total += sum(positions.nbytes for groups in dataset["index"].values() for positions in groups.values())
+    total += dataset["scenario_base"].nbytes
+    total += sum(cube.nbytes for cube in dataset["sensitivity"].values())
+    total += dataset["schools"]["rows"].nbytes + dataset["schools"]["codes"].nbytes
+    total += sum(bits.nbytes for bits in dataset["schools"]["bitsets"].values())
+    return total
+
+
+def process_rss_bytes():
+    """Resident memory of this process, or None if the platform does not expose it"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Peak rather than current RSS; kilobytes on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def show_memory_report(dataset):
+    """Sidebar panel with the memory shared across sessions (?memory=1 or CPS_MEMORY_REPORT=1)"""
+    shared = dataset_memory_bytes(dataset)
+    # st.cache_data used to hand every session its own deserialized copy of the frame
+    saved = int(dataset["df"].memory_usage(index=True, deep=True).sum())
+    rss = process_rss_bytes()
+    with st.sidebar.expander("🧠 Memory report"):
+        st.markdown(f"**Dataset version:** `{dataset['hash'][:12]}`")
+        st.markdown(f"**Shared by all sessions:** {shared / 2**20:,.2f} MB")
+        st.markdown(f"**Saved per session:** {saved / 2**20:,.2f} MB per rerun (no per-session DataFrame copy)")
+        if rss is not None:
+            st.markdown(f"**Process resident memory:** {rss / 2**20:,.1f} MB")
+        for label, cache in [("View cache", get_view_cache()), ("What-if cache", get_scenario_cache()),
+                             ("Sensitivity cache", get_sensitivity_cache()),
+                             ("CSV export cache", get_export_cache())]:
+            stats = cache.stats()
+            st.markdown(f"**{label}:** {stats['size']}/{stats['maxsize']} entries, {stats['hits']:,} hits, {stats['misses']:,} misses")
+
+
+# Filter modes and the geography kind each one selects
+FILTER_KINDS = {
+    "Chamber & District": "district",
+    "Legislator Name": "legislator",
+    "Ward": "ward",
+    "Adler Name": "alderman",
+    "Multiple Geographies": "selection",
+}
+
+# Rendered views kept per process (there are only a few hundred distinct geographies)
+VIEW_CACHE_SIZE = 512
+
+
+class LRUCache:
+    """Thread-safe, size-bounded cache with least-recently-used eviction and hit/miss counters"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_create(self, key, factory):
+        """Return the cached value for key, building it with factory() on a miss"""
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key]
+            self.misses += 1
+        # Built outside the lock; two sessions missing the same key just build it twice
+        value = factory()
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._items), "maxsize": self.maxsize}
+
+
+@st.cache_resource
+def get_view_cache():
+    """Process-wide cache of rendered geography views"""
+    return LRUCache(VIEW_CACHE_SIZE)
+
+
+def describe_geography(catalog, filter_type, geo_key):
+    """Subheader, district name and download file prefix of a selection"""
+    if filter_type == "Multiple Geographies":
+        operation, geo_ids = geo_key
+        labels = [catalog["selection_labels"][geo_id] for geo_id in geo_ids]
+        joiner = " or " if operation == "union" else " and "
+        name = joiner.join(labels)
+        prefix_labels = labels if len(labels) <= 3 else labels[:3] + [f"{len(labels) - 3}_more"]
+        return {
+            "subheader": f"📊 Schools in {name}" if labels else "📊 No geographies selected",
+            "district_name": name,
+            "filename_prefix": joiner.replace(" ", "_").join(label.replace(" ", "_") for label in prefix_labels) or "No_Selection",
         }
-        
-        .stMain .block-container {
-            padding-left: 1rem !important;
-            padding-right: 1rem !important;
+    if filter_type == "Chamber & District":
+        chamber, district = geo_key
+        legislator = catalog['district_legislator'][geo_key]
+    elif filter_type == "Legislator Name":
+        legislator = geo_key
+        chamber, district = catalog["legislator_district"][geo_key]
+    elif filter_type == "Ward":
+        ward, alderman = geo_key, catalog['ward_alderman'][geo_key]
+    else:
+        ward, alderman = catalog['alderman_ward'][geo_key], geo_key
+
+    if filter_type in ("Chamber & District", "Legislator Name"):
+        return {
+            "subheader": f"📊 {legislator} ({chamber} District {district})",
+            "district_name": f"{chamber} District {district}",
+            "filename_prefix": f"{chamber.replace(' ', '_')}_District_{district}",
         }
-    
-    /* Force all text to be black */
-    .stMarkdown, .stText, .stCaption, .stSubheader, .stHeader, .stTitle {
-        color: black !important;
-    }
-    
-    /* Fix tab labels specifically */
-    .stTabs [data-baseweb="tab-list"] button {
-        color: black !important;
-    }
-    
-    .stTabs [data-baseweb="tab-list"] button[aria-selected="true"] {
-        color: black !important;
-        font-weight: bold !important;
-    }
-    
-    /* Fix subheaders in tabs */
-    .stTabs [data-baseweb="tab-panel"] h3 {
-        color: black !important;
-    }
-    
-        /* Fix tab labels specifically */
-    .stTabs [data-baseweb="tab-list"] button {
-        color: black !important;
-    }
-    
-    .stTabs [data-baseweb="tab-list"] button[aria-selected="true"] {
-        color: black !important;
-        font-weight: bold !important;
-    }
-    
-    /* Fix subheaders in tabs */
-    .stTabs [data-baseweb="tab-panel"] h3 {
-        color: black !important;
+    return {
+        "subheader": f"📊 {alderman} (Ward - {ward})",
+        "district_name": f"Ward {ward}",
+        "filename_prefix": f"Ward_{ward}",
     }
-    
-    /* REMOVE TAB BORDERS ON MOBILE */
-    .stTabs [data-baseweb="tab-list"] {
-        border: none !important;
-        border-bottom: none !important;
-    }
-    
-    .stTabs [data-baseweb="tab-list"] button {
-        border: none !important;
-        border-radius: 0 !important;
-        box-shadow: none !important;
+
+
+def build_geography_view(dataset, filter_type, geo_key):
+    """Everything tab1 and tab3 show for one selection: metrics and rendered tables"""
+    geo_kind = FILTER_KINDS[filter_type]
+    view = describe_geography(dataset["catalog"], filter_type, geo_key)
+    with stage_timing.timer("filter", geo_kind):
+        display_rows = dataset["display"].take(geography_positions(dataset, geo_kind, geo_key))
+    with stage_timing.timer("totals", geo_kind):
+        totals = dataset_geography_totals(dataset, geo_kind, geo_key)
+
+    with stage_timing.timer("format", geo_kind):
+        formatted_totals = dataset_geography_display_totals(dataset, geo_kind, geo_key)
+
+        # Capital display dataframe from the pre-formatted columns, renamed for display,
+        # plus the precomputed and formatted totals row
+        capital_df = display_rows[list(CAPITAL_DISPLAY_COLUMNS)].rename(columns=CAPITAL_DISPLAY_COLUMNS)
+        capital_totals = {}
+        capital_totals['School Name'] = 'TOTAL'
+        capital_totals['Immediate (within 5 years)'] = formatted_totals['Immediate Capital Needs']
+        capital_totals['Total Capital Needs'] = formatted_totals['Total Capital Needs']
+        capital_final_df = pd.concat([capital_df, pd.DataFrame([capital_totals])], ignore_index=True)
+
+        # Pre-formatted cuts columns (positions as integers, % as 0.00%, missing as blank)
+        # plus the precomputed, pre-formatted totals row
+        totals_row = pd.DataFrame([{col: formatted_totals[col] for col in CUTS_DISPLAY_COLUMNS[1:]}])
+        totals_row['School Name'] = f"{view['district_name']} Total"
+        formatted_cuts_df = pd.concat([display_rows[CUTS_DISPLAY_COLUMNS], totals_row], ignore_index=True)
+
+        capital_metrics = [
+            ("Schools", totals['Schools']),
+            ("Immediate Capital Needs", capital_totals['Immediate (within 5 years)']),
+            ("Total Capital Needs", capital_totals['Total Capital Needs']),
+        ]
+        cuts_metrics = [
+            ("Total Position Loss/Gain", f"{totals['Position loss/gain (budgeted)']:,.0f}"),
+            ("% of Positions", f"{totals['Position loss/gain (% of FY25 positions)']:,.0%}"),
+            ("Teacher Position Loss/Gain", f"{totals['Teacher positions loss/gain (budgeted)']:,.0f}"),
+            ("% of Teacher Positions", f"{totals['Teacher positions loss/gain (% of FY25)']:,.0%}"),
+            ("SPED Position Loss/Gain", f"{totals['SPED position loss/gain (budgeted)']:,.0f}"),
+            ("% of SPED Positions", f"{totals['SPED position loss/gain (% of FY25 SPED positions)']:,.0%}"),
+        ]
+
+    with stage_timing.timer("html", geo_kind):
+        capital_html = create_html_table_capital(capital_final_df)
+        cuts_html = create_html_table_cuts(formatted_cuts_df)
+
+    view.update({
+        "kind": geo_kind,
+        "key": geo_key,
+        "schools": len(display_rows),
+        "totals": totals,
+        "capital_metrics": capital_metrics,
+        "capital_html": capital_html,
+        "cuts_metrics": cuts_metrics,
+        "cuts_html": cuts_html,
+    })
+    return view
+
+
+def get_geography_view(dataset, filter_type, geo_key):
+    """Rendered view of a selection, cached per (dataset version, filter mode, geography)"""
+    return get_view_cache().get_or_create(
+        (dataset["hash"], filter_type, geo_key),
+        lambda: build_geography_view(dataset, filter_type, geo_key),
+    )
+
+
+# What-if cut scenarios. The CSV's fixed "7% Cut"/"15% Cut" columns are just the base
+# column times the rate, so the cut at any rate is computed from the base columns instead.
+# Base column -> scenario column labels (base, amount cut)
+SCENARIO_COLUMNS = {
+    'Operational Budget FY25': ("FY25 Budget", "Budget Cut"),
+    'Positions': ("Total Positions", "Position Loss"),
+    'SPED Positions': ("SPED Positions", "SPED Loss"),
+}
+SCENARIO_FORMATS = [format_currency, format_positions, format_positions]
+SCENARIO_DEFAULT_RATE = 7
+SCENARIO_MAX_RATE = 50
+
+
+def scenario_base_values(df):
+    """Scenario base columns of every school as one (schools x columns) array, NaN kept"""
+    return np.ascontiguousarray(df[list(SCENARIO_COLUMNS)].to_numpy(dtype=float))
+
+
+def scenario_cuts(base, rates):
+    """Amounts cut from base values at the given rates (fractions)
+
+    Broadcasts base (... x columns) against rates: a scalar rate keeps base's
+    shape, an array of rates adds its dimensions at the end.
+    """
+    return np.multiply.outer(base, rates)
+
+
+def build_scenario_view(dataset, filter_type, geo_key, rate_pct):
+    """Metrics and table of the what-if tab for one selection at a cut rate in percent"""
+    geo_kind = FILTER_KINDS[filter_type]
+    rate = rate_pct / 100
+    positions = geography_positions(dataset, geo_kind, geo_key)
+    base = dataset["scenario_base"][positions]
+    cuts = scenario_cuts(base, rate)
+    totals = dataset_geography_totals(dataset, geo_kind, geo_key)
+    base_totals = np.array([totals[col] for col in SCENARIO_COLUMNS], dtype=float)
+    cut_totals = scenario_cuts(base_totals, rate)
+
+    columns = {'School Name': np.append(dataset["display"]['School Name'].to_numpy()[positions], "TOTAL")}
+    cut_labels = []
+    for i, ((base_label, cut_label), formatter) in enumerate(zip(SCENARIO_COLUMNS.values(), SCENARIO_FORMATS)):
+        cut_label = f"{cut_label} ({rate_pct}%)"
+        cut_labels.append(cut_label)
+        columns[base_label] = format_values(np.append(base[:, i], base_totals[i]), formatter)
+        columns[cut_label] = format_values(np.append(cuts[:, i], cut_totals[i]), formatter)
+    table = pd.DataFrame(columns)
+
+    return {
+        "rate": rate_pct,
+        "metrics": [
+            (f"Operations Cut ({rate_pct}%)", format_currency(cut_totals[0])),
+            (f"Positions Lost ({rate_pct}%)", format_positions(cut_totals[1])),
+            (f"SPED Positions Lost ({rate_pct}%)", format_positions(cut_totals[2])),
+        ],
+        "html": render_html_table(table, CUTS_TABLE_HEADER, column_classes=dict.fromkeys(cut_labels, "cut2-column")),
     }
-    
-    .stTabs [data-baseweb="tab-panel"] {
-        border: none !important;
-        border-top: none !important;
-        box-shadow: none !important;
+
+
+# What-if views kept per process. One per slider position and geography, so they get
+# their own cache: dragging the slider must not evict the geography views.
+SCENARIO_CACHE_SIZE = 512
+
+
+@st.cache_resource
+def get_scenario_cache():
+    """Process-wide cache of rendered what-if views"""
+    return LRUCache(SCENARIO_CACHE_SIZE)
+
+
+def get_scenario_view(dataset, filter_type, geo_key, rate_pct):
+    """What-if view of a selection at a cut rate, cached per (dataset version, filter mode, geography, rate)"""
+    return get_scenario_cache().get_or_create(
+        (dataset["hash"], filter_type, geo_key, rate_pct),
+        lambda: build_scenario_view(dataset, filter_type, geo_key, rate_pct),
+    )
+
+
+# Sensitivity cube: cuts of every geography at every rate of a fixed grid, computed
+# once per dataset so "what does each district lose at X%" is a slice, not a rerun.
+SENSITIVITY_RATES = np.arange(0, 26)
+# Measure -> column of the cube's second axis
+SENSITIVITY_MEASURES = {cut_label: i for i, (_, cut_label) in enumerate(SCENARIO_COLUMNS.values())}
+
+
+def build_sensitivity_cube(aggregates, rates_pct=SENSITIVITY_RATES):
+    """{kind: (geographies x scenario columns x rates) amounts cut}
+
+    The base totals of every geography kind are stacked and broadcast against
+    the rate grid in one pass; each kind's cube is a view into the result,
+    with rows in the order of aggregates[kind].
+    """
+    bases = [table[list(SCENARIO_COLUMNS)].to_numpy() for table in aggregates.values()]
+    cube = scenario_cuts(np.concatenate(bases), np.asarray(rates_pct) / 100)
+    return dict(zip(aggregates, np.split(cube, np.cumsum([len(base) for base in bases])[:-1])))
+
+
+def geography_label(geo_kind, geo_key):
+    """Short display name of a geography (e.g. "IL House 5", "Ward 14")"""
+    if geo_kind == "district":
+        return f"{geo_key[0]} {geo_key[1]}"
+    if geo_kind == "ward":
+        return f"Ward {geo_key}"
+    return str(geo_key)
+
+
+def sensitivity_table(dataset, geo_kind, measure):
+    """Geographies x rates table of one measure, sorted by geography"""
+    cube = dataset["sensitivity"][geo_kind][:, SENSITIVITY_MEASURES[measure], :]
+    keys = dataset["aggregates"][geo_kind].index
+    table = pd.DataFrame(cube, index=[geography_label(geo_kind, key) for key in keys],
+                         columns=[f"{rate}%" for rate in SENSITIVITY_RATES])
+    table.index.name = "Geography"
+    order = sorted(range(len(keys)), key=keys.__getitem__)
+    return table.iloc[order].round(0 if measure == "Budget Cut" else 1)
+
+
+def sensitivity_heatmap(table, measure):
+    """Long-form data and Vega-Lite spec (without the data) of a sensitivity table's heatmap"""
+    long = table.reset_index().melt(id_vars="Geography", var_name="Cut rate", value_name=measure)
+    chart = (
+        alt.Chart(long)
+        .mark_rect()
+        .encode(
+            x=alt.X("Cut rate:O", sort=list(table.columns)),
+            y=alt.Y("Geography:N", sort=list(table.index)),
+            color=alt.Color(f"{measure}:Q", scale=alt.Scale(scheme="reds")),
+            tooltip=["Geography", "Cut rate", alt.Tooltip(f"{measure}:Q", format=",.1f")],
+        )
+        .properties(height=max(200, 14 * len(table)))
+    )
+    # Converted once here instead of by st.altair_chart on every render; the data is
+    # passed to st.vega_lite_chart separately so it still goes out as Arrow
+    spec = chart.to_dict()
+    del spec["data"], spec["datasets"]
+    return long, spec
+
+
+# Sensitivity views (table and heatmap of one filter mode and measure) kept per process
+SENSITIVITY_CACHE_SIZE = 32
+
+
+@st.cache_resource
+def get_sensitivity_cache():
+    """Process-wide cache of sensitivity tables and heatmaps"""
+    return LRUCache(SENSITIVITY_CACHE_SIZE)
+
+
+def build_sensitivity_view(dataset, geo_kind, measure):
+    """Table, heatmap data and heatmap spec of one geography kind and measure"""
+    table = sensitivity_table(dataset, geo_kind, measure)
+    long, spec = sensitivity_heatmap(table, measure)
+    return {"table": table, "long": long, "spec": spec}
+
+
+def get_sensitivity_view(dataset, geo_kind, measure):
+    """Sensitivity view, cached per (dataset version, geography kind, measure)"""
+    return get_sensitivity_cache().get_or_create(
+        (dataset["hash"], geo_kind, measure),
+        lambda: build_sensitivity_view(dataset, geo_kind, measure),
+    )
+
+
+def sensitivity_npz(dataset):
+    """The whole cube as a compressed .npz: <kind>_cuts arrays, <kind>_ids, rates and columns"""
+    arrays = {"rates_pct": SENSITIVITY_RATES, "columns": np.array(list(SENSITIVITY_MEASURES))}
+    for geo_kind, cube in dataset["sensitivity"].items():
+        arrays[f"{geo_kind}_cuts"] = cube
+        arrays[f"{geo_kind}_ids"] = np.array([geography_id(geo_kind, key) for key in dataset["aggregates"][geo_kind].index])
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **arrays)
+    return buffer.getvalue()
+
+
+# Leaderboards: every House district, Senate district and ward ranked by each metric.
+# The formatted tables and the rank order of every metric are built once per dataset,
+# so switching the metric or the number of rows is only a slice.
+LEADERBOARD_GROUPS = {
+    "IL House Districts": ("district", "IL House"),
+    "IL Senate Districts": ("district", "IL Senate"),
+    "Wards": ("ward", None),
+}
+
+# Metric -> aggregate column shown for it
+LEADERBOARD_METRICS = {
+    "Immediate Capital Needs": 'Immediate Capital Needs',
+    "Total Capital Needs": 'Total Capital Needs',
+    "Total Position Loss": 'Position loss/gain (budgeted)',
+    "% of Positions Lost": 'Position loss/gain (% of FY25 positions)',
+}
+
+# Loss metrics are shown as the score they are ranked by, a loss positive and a gain
+# negative: the CSV's change column is negative for a loss and its percentage is unsigned
+LEADERBOARD_SHOW_SCORES = ("Total Position Loss", "% of Positions Lost")
+
+
+def leaderboard_scores(table):
+    """Score per geography and metric (higher ranks first); losses are negative changes"""
+    change = table['Position loss/gain (budgeted)'].to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct_lost = -change / table['Total FY25'].to_numpy()
+    return {
+        "Immediate Capital Needs": table['Immediate Capital Needs'].to_numpy(),
+        "Total Capital Needs": table['Total Capital Needs'].to_numpy(),
+        "Total Position Loss": -change,
+        "% of Positions Lost": pct_lost,
     }
-    
-    /* Mobile specific tab border removal */
-    @media (max-width: 768px) {
-        .stTabs [data-baseweb="tab-list"] {
-            border: none !important;
-            outline: none !important;
-        }
-        
-        .stTabs [data-baseweb="tab-list"] button {
-            border: none !important;
-            outline: none !important;
-            box-shadow: none !important;
-        }
-        
-        .stTabs [data-baseweb="tab-panel"] {
-            border: none !important;
-            outline: none !important;
-            box-shadow: none !important;
+
+
+def rank_order(scores):
+    """Positions sorted by descending score (ties keep table order, NaN last)"""
+    return np.argsort(-np.nan_to_num(scores, nan=-np.inf), kind="stable")
+
+
+def build_leaderboards(aggregates, catalog):
+    """{group: {"table": formatted rows, "orders": {metric: rank order}}}"""
+    leaderboards = {}
+    for group, (geo_kind, chamber) in LEADERBOARD_GROUPS.items():
+        table = aggregates[geo_kind]
+        if chamber is not None:
+            table = table[table.index.get_level_values("Chamber") == chamber]
+        if geo_kind == "district":
+            names = [catalog["district_legislator"][key] for key in table.index]
+            geographies = [f"District {district}" for _, district in table.index]
+        else:
+            names = [catalog["ward_alderman"][key] for key in table.index]
+            geographies = [f"Ward {ward}" for ward in table.index]
+        scores = leaderboard_scores(table)
+        formatted = pd.DataFrame({"Geography": geographies, "Name": names, "Schools": table["Schools"].to_numpy()})
+        for metric, col in LEADERBOARD_METRICS.items():
+            values = scores[metric] if metric in LEADERBOARD_SHOW_SCORES else table[col].to_numpy()
+            formatted[metric] = format_values(values, DISPLAY_FORMATS[col])
+        leaderboards[group] = {
+            "table": formatted,
+            "orders": {metric: rank_order(metric_scores) for metric, metric_scores in scores.items()},
         }
-    }
-    
-    /* Force all headers to be black */
-    h1, h2, h3, h4, h5, h6 {
-        color: black !important;
-    }
-    
-    /* Fix metric labels and values */
-    .stMetric > div > div {
-        color: black !important;
-    }
-    
-    .stMetric label {
-        color: black !important;
-    }
-    
-    .stMetric > div > div > div {
-        color: black !important;
-    }
-    
-    /* Fix all metric text */
-    [data-testid="metric-container"] {
-        color: black !important;
-    }
-    
-    [data-testid="metric-container"] > div {
-        color: black !important;
-    }
-    
-    [data-testid="metric-container"] label {
-        color: black !important;
-    }
-    
-        /* INCREASE METRIC FONT SIZE */
-    .stMetric {
-        font-size: 1.3rem !important;
-    }
-    
-    .stMetric label {
-        font-size: 1.2rem !important;
-        font-weight: 700 !important;
-    }
-    
-    .stMetric [data-testid="metric-value"] {
-        font-size: 2.2rem !important;
-        font-weight: 800 !important;
-    }
-    
-    .stMetric [data-testid="metric-delta"] {
-        font-size: 1.3rem !important;
-    }
-    
-    /* Additional metric targeting */
-    [data-testid="metric-container"] label {
-        font-size: 1.5rem !important;
-        font-weight: 700 !important;
-    }
-    
-    [data-testid="metric-container"] div[data-testid="metric-value"] {
-        font-size: 2.8rem !important;
-        font-weight: 800 !important;
-    }
-    
-       /* Additional metric targeting */
-    [data-testid="metric-container"] label {
-        font-size: 1.5rem !important;
-        font-weight: 700 !important;
-    }
-    
-    [data-testid="metric-container"] div[data-testid="metric-value"] {
-        font-size: 2.8rem !important;
-        font-weight: 800 !important;
-    }
-    
-        /* TARGET METRIC LABELS SPECIFICALLY - EXACT STRUCTURE */
-    [data-testid="stMetricLabel"] p {
-        font-size: 1.5rem !important;
-        font-weight: 500 !important;
-        color: black !important;
-    }
-    
-    /* Target the markdown container inside metric labels */
-    [data-testid="stMetricLabel"] [data-testid="stMarkdownContainer"] p {
-        font-size: 1.5rem !important;
-        font-weight: 500 !important;
-        color: black !important;
-    }
-    
-    /* Nuclear option for metric label paragraphs */
-    label[data-testid="stMetricLabel"] p,
-    .st-emotion-cache-15jn9ue p,
-    .st-emotion-cache-bfgnao p {
-        font-size: 1.5rem !important;
-        font-weight: 500 !important;
-        color: black !important;
-    }
-    
-    /* Ensure metric values stay large */
-    [data-testid="metric-container"] div[data-testid="metric-value"],
-    .stMetric [data-testid="metric-value"] {
-        font-size: 2.8rem !important;
-        font-weight: 800 !important;
-    }
-    
-    /* Target metric text content directly */
-    div[data-testid="metric-container"] div:first-child {
-        font-size: 1.5rem !important;
-        font-weight: 500 !important;
-        color: black !important;
-    }
-    
-    /* TARGET METRIC VALUES SPECIFICALLY */
-    [data-testid="stMetricValue"] {
-        font-size: 2.3rem !important;
-        font-weight: 700 !important;
-        color: black !important;
-    }
-    
-    /* TARGET METRIC DELTA SPECIFICALLY */
-    [data-testid="stMetricDelta"] {
-        font-size: 1.3rem !important;
-        color: black !important;
-    }
-    
-    /* Nuclear option for metric elements */
-    div[data-testid*="metric"] {
-        font-size: inherit !important;
-        color: black !important;
-    }
-    
-    /* Ensure sidebar is also light */
-    .css-1d391kg {
-        background-color: #f0f2f6 !important;
-    }
-    
-     /* FIX MOBILE SIDEBAR - Add these new rules */
-    .stSidebar {
-        background-color: #f0f2f6 !important;
-    }
-        
-    .stSidebar > div {
-        background-color: #f0f2f6 !important;
-    }
-    
-    /* Target mobile sidebar specifically */
-    .stSidebar .stMarkdown {
-        background-color: #f0f2f6 !important;
-        color: black !important;
-    }
-    
-    /* Fix mobile sidebar container */
-    section[data-testid="stSidebar"] {
-        background-color: #f0f2f6 !important;
-    }
-    
-    section[data-testid="stSidebar"] > div {
-        background-color: #f0f2f6 !important;
-    }
-    
-    /* Ensure sidebar is also light */
-    .css-1d391kg {
-        background-color: #f0f2f6 !important;
-    }
-    
-    /* FIX MOBILE SIDEBAR BACKGROUND AND TEXT */
-    .stSidebar {
-        background-color: #f0f2f6 !important;
-    }
-    
-    .stSidebar > div {
-        background-color: #f0f2f6 !important;
-    }
-    
-    section[data-testid="stSidebar"] {
-        background-color: #f0f2f6 !important;
-    }
-    
-    section[data-testid="stSidebar"] > div {
-        background-color: #f0f2f6 !important;
-    }
-    
-    .stSidebar .element-container {
-        background-color: #f0f2f6 !important;
-    }
-    
-    /* FIX SIDEBAR TEXT COLOR */
-    .stSidebar .stMarkdown {
-        background-color: #f0f2f6 !important;
-        color: black !important;
-    }
-    
-    .stSidebar .stMarkdown p {
-        color: black !important;
-    }
-    
-    .stSidebar .stMarkdown h1, 
-    .stSidebar .stMarkdown h2, 
-    .stSidebar .stMarkdown h3, 
-    .stSidebar .stMarkdown h4 {
-        color: black !important;
-    }
-    
-    /* Fix sidebar selectbox text */
-    .stSidebar .stSelectbox label {
-        color: black !important;
-    }
-    
-    .stSidebar .stRadio label {
-        color: black !important;
-    }
-    
-    /* Fix sidebar info/success messages */
-    .stSidebar .element-container div {
-        color: black !important;
-    }
-       
-    /* FIX DOWNLOAD AND REGULAR BUTTONS - White background, black text */
-    .stDownloadButton > button {
-        background-color: white !important;
-        color: black !important;
-        border: 1px solid #ddd !important;
-    }
-    
-    .stDownloadButton > button:hover {
-        background-color: #f0f2f6 !important;
-        color: black !important;
-    }
-    
-    /* Fix all button types - White background, black text */
-    .stButton > button {
-        background-color: white !important;
-        color: black !important;
-        border: 1px solid #ddd !important;
-    }
-    
-    .stButton > button:hover {
-        background-color: #f0f2f6 !important;
-        color: black !important;
-    }
-    
-    /* Fix sidebar buttons specifically */
-    .stSidebar .stButton > button {
-        background-color: white !important;
-        color: black !important;
-        border: 1px solid #ddd !important;
-    }
-    
-        /* Fix radio buttons background - Container light gray */
-    .stRadio > div {
-        background-color: #f0f2f6 !important;
-        color: black !important;
-    }
-    
-    /* Fix radio button labels - Container light gray */
-    .stRadio > div > label {
-        background-color: #f0f2f6 !important;
-        color: black !important;
-    }
-    
-    /* Fix radio button options container - Light gray */
-    .stRadio > div > div {
-        background-color: #f0f2f6 !important;
-    }
-    
-    /* Fix the actual radio button circles - Make them white */
-    .stRadio input[type="radio"] {
-        background-color: white !important;
-    }
-    
-    /* Fix sidebar radio buttons specifically - Container light gray */
-    .stSidebar .stRadio > div {
-        background-color: #f0f2f6 !important;
-        color: black !important;
-    }
-    
-    .stSidebar .stRadio > div > label {
-        background-color: #f0f2f6 !important;
-        color: black !important;
-    }
-    
-    /* Fix sidebar radio button circles - White */
-    .stSidebar .stRadio input[type="radio"] {
-        background-color: white !important;
-    }
-    
-    /* Fix selectbox (dropdown) containers - Make them white */
-    .stSelectbox > div > div {
-        background-color: white !important;
-        color: black !important;
-    }
-    
-    .stSelectbox > div > div > div {
-        background-color: white !important;
-        color: black !important;
-    }
-    
-    /* Fix sidebar selectbox specifically */
-    .stSidebar .stSelectbox > div > div {
-        background-color: white !important;
-        color: black !important;
-    }
-    
-    .stSidebar .stSelectbox > div > div > div {
-        background-color: white !important;
-        color: black !important;
-    }
-    
-    /* Fix selectbox input field */
-    .stSelectbox input {
-        background-color: white !important;
-        color: black !important;
-    }
-    
-    /* FORCE DOWNLOAD BUTTONS TO WHITE BACKGROUND */
-    .stDownloadButton > button {
-        background-color: white !important;
-        color: black !important;
-        border: 1px solid #ddd !important;
-    }
-    
-    .stDownloadButton > button:hover {
-        background-color: #f0f2f6 !important;
-        color: black !important;
-    }
-    
-    /* Force sidebar download buttons to white */
-    .stSidebar .stDownloadButton > button {
-        background-color: white !important;
-        color: black !important;
-        border: 1px solid #ddd !important;
-    }
-    
-    .stSidebar .stDownloadButton > button:hover {
-        background-color: #f0f2f6 !important;
-        color: black !important;
-    }
-    
-    /* Target the CSV download button specifically */
-    .stSidebar [data-testid="stDownloadButton"] button {
-        background-color: white !important;
-        color: black !important;
-        border: 1px solid #ddd !important;
-    }
-    
-    .stSidebar [data-testid="stDownloadButton"] button:hover {
-        background-color: #f0f2f6 !important;
-        color: black !important;
-    }
-    
-    /* Nuclear option for all sidebar buttons */
-    section[data-testid="stSidebar"] button {
-        background-color: white !important;
-        color: black !important;
-        border: 1px solid #ddd !important;
-    }
-    
-    section[data-testid="stSidebar"] button:hover {
-        background-color: #f0f2f6 !important;
-        color: black !important;
-    }
-    
-    /* FIX SIDEBAR COLLAPSE BUTTON - MAKE WHITE */
-    .css-1v0mbdj {
-        background-color: white !important;
-        color: black !important;
-        border: 1px solid #ddd !important;
-    }
-    
-    .css-1v0mbdj:hover {
-        background-color: #f0f2f6 !important;
-        color: black !important;
-    }
-    
-    /* Alternative sidebar button selectors */
-    [data-testid="collapsedControl"] {
-        background-color: white !important;
-        color: black !important;
-        border: 1px solid #ddd !important;
-    }
-    
-    [data-testid="collapsedControl"]:hover {
-        background-color: #f0f2f6 !important;
-        color: black !important;
-    }
-    
-    /* Sidebar toggle button */
-    .st-emotion-cache-1v0mbdj {
-        background-color: white !important;
-        color: black !important;
-        border: 1px solid #ddd !important;
-    }
-    
-    .st-emotion-cache-1v0mbdj:hover {
-        background-color: #f0f2f6 !important;
-        color: black !important;
-    }
-    
-    /* NUCLEAR OPTION - Force ALL buttons to white background */
-    button {
-        background-color: white !important;
-        color: black !important;
-        border: 1px solid #ddd !important;
-    }
-    
-        /* FIX SIDEBAR EXPAND BUTTON - MAKE WHITE */
-    [data-testid="stSidebarNav"] button {
-        background-color: white !important;
-        color: black !important;
-        border: 1px solid #ddd !important;
-    }
-    
-    [data-testid="stSidebarNav"] button:hover {
-        background-color: #f0f2f6 !important;
-        color: black !important;
-    }
-    
-    /* Alternative selector for sidebar expand button */
-    .css-1lcbmhc {
-        background-color: white !important;
-        color: black !important;
-        border: 1px solid #ddd !important;
-    }
-    
-    .css-1lcbmhc:hover {
-        background-color: #f0f2f6 !important;
-        color: black !important;
-    }
-    
-    button:hover {
-        background-color: #f0f2f6 !important;
-        color: black !important;
-    }
-    
-        /* Sidebar expand/collapse button - Additional selectors */
-    [data-testid="stSidebarNavSeparator"] + div button {
-        background-color: white !important;
-        color: black !important;
-        border: 1px solid #ddd !important;
-    }
-    
-    [data-testid="stSidebarNavSeparator"] + div button:hover {
-        background-color: #f0f2f6 !important;
-        color: black !important;
-    }
-    
-    /* Force arrow icons to be black */
-    [data-testid="stSidebarNav"] button svg {
-        color: black !important;
-        fill: black !important;
-    }
-    
-    .css-1lcbmhc svg {
-        color: black !important;
-        fill: black !important;
-    }
-    
-    /* Additional arrow icon selectors */
-    button[data-testid="stSidebarNavSeparator"] + div button svg {
-        color: black !important;
-        fill: black !important;
-    }
-    
-    /* Catch any remaining arrow icons */
-    section[data-testid="stSidebar"] svg {
-        color: black !important;
-        fill: black !important;
-    }
-    
-        /* FORCE SIDEBAR ARROW ICONS TO BE BLACK - FINAL OVERRIDE */
-    button svg, button svg path {
-        color: black !important;
-        fill: black !important;
-        stroke: black !important;
-    }
-    
-    /* Specific targeting for sidebar expand/collapse arrows */
-    [data-testid="stSidebarNav"] svg,
-    [data-testid="stSidebarNav"] svg path,
-    .css-1lcbmhc svg,
-    .css-1lcbmhc svg path,
-    section[data-testid="stSidebar"] svg,
-    section[data-testid="stSidebar"] svg path {
-        color: black !important;
-        fill: black !important;
-        stroke: black !important;
-    }
-    
-    /* Target any keyboard arrow icons specifically */
-    button[title*="Expand"] svg,
-    button[title*="Collapse"] svg,
-    button[aria-label*="sidebar"] svg {
-        color: black !important;
-        fill: black !important;
-        stroke: black !important;
-    }
-    
-       /* NUCLEAR OPTION FOR ALL ICONS - FORCE BLACK */
-    * svg, * svg path, * svg g, * svg polygon, * svg circle, * svg rect {
-        color: black !important;
-        fill: black !important;
-        stroke: black !important;
-    }
-    
-    /* Target specific arrow characters if they're text */
-    button::before, button::after {
-        color: black !important;
-    }
-    
-    /* Force any pseudo-elements to be black */
-    button * {
-        color: black !important;
-    }
-    
-    /* If arrows are Unicode characters */
-    [data-testid*="sidebar"] button, 
-    [data-testid*="Sidebar"] button,
-    button[title*="expand"],
-    button[title*="collapse"] {
-        color: black !important;
-    }
-    
-    </style>
-    """, unsafe_allow_html=True)
+    return leaderboards
+
+
+def leaderboard_rows(leaderboard, metric, top_n):
+    """The top_n rows of a leaderboard ranked by one metric, with their rank"""
+    order = leaderboard["orders"][metric][:top_n]
+    rows = leaderboard["table"].take(order).reset_index(drop=True)
+    rows.insert(0, "Rank", np.arange(1, len(order) + 1))
+    return rows
+
+
+# CSV exports. Built only when a download is clicked (or by the optional background
+# precompute, CPS_PRECOMPUTE_EXPORTS=1) and memoized per geography.
+EXPORT_CACHE_SIZE = 512
+
+
+@st.cache_resource
+def get_export_cache():
+    """Process-wide cache of per-geography CSV exports"""
+    return LRUCache(EXPORT_CACHE_SIZE)
+
+
+def geography_csv(dataset, geo_kind, geo_key):
+    """CSV export (all columns) of one geography's schools"""
+    with stage_timing.timer("csv", geo_kind):
+        rows = dataset["df"].take(geography_positions(dataset, geo_kind, geo_key))
+        return rows.to_csv(index=False).encode("utf-8")
+
+
+def cached_geography_csv(export_cache, dataset, geo_kind, geo_key):
+    """CSV export of one geography, memoized per dataset version"""
+    return export_cache.get_or_create(
+        (dataset["hash"], geo_kind, geo_key),
+        lambda: geography_csv(dataset, geo_kind, geo_key),
+    )
+
+
+def precompute_exports(export_cache, dataset):
+    """Fill the export cache for every geography"""
+    for geo_kind, groups in dataset["index"].items():
+        for geo_key in groups:
+            cached_geography_csv(export_cache, dataset, geo_kind, geo_key)
+
+
+@st.cache_resource
+def start_export_precompute(_dataset, dataset_hash):
+    """Precompute every geography's CSV export on a background thread, once per dataset version"""
+    thread = threading.Thread(
+        target=precompute_exports,
+        args=(get_export_cache(), _dataset),
+        name=f"csv-exports-{dataset_hash[:12]}",
+        daemon=True,
+    )
+    thread.start()
+    return thread
+
+
+# Stylesheet. Kept readable in assets/, minified once per process.
+STYLESHEET_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "dashboard.css")
+
+
+def minify_css(css):
+    """Strip comments and redundant whitespace from a stylesheet"""
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{}:;,>])\s*", r"\1", css)
+    return css.replace(";}", "}").strip()
+
+
+@st.cache_resource
+def load_stylesheet():
+    """The dashboard style overrides as a minified <style> block"""
+    try:
+        with open(STYLESHEET_FILE, encoding="utf-8") as f:
+            return f"<style>{minify_css(f.read())}</style>"
+    except FileNotFoundError:
+        return ""
+
+
+# Formatted great_tables reports (sidebar buttons, batch pre-render)
+REPORT_TYPES = ("capital", "cuts")
+
+
+def load_report_stack():
+    """polars and great_tables, imported on the first report build instead of at startup"""
+    with timed_import("polars"):
+        import polars as pl
+    with timed_import("great_tables"):
+        from great_tables import GT, loc, style
+    return pl, GT, loc, style
+
+
+def build_capital_report_html(rows, totals, district_name, data_version):
+    """Capital needs report for one geography as a standalone HTML document (bytes)"""
+    pl, GT, loc, style = load_report_stack()
+    # Add district total row to the selected rows
+    capital_df_with_total = rows[['School Name', 'Immediate Capital Needs', 'Total Capital Needs']].copy()
+
+    # Create district total row
+    total_row = pd.DataFrame([[
+        f"{district_name} Total",
+        totals['Immediate Capital Needs'],
+        totals['Total Capital Needs']
+    ]])
+    total_row.columns = capital_df_with_total.columns
+    capital_df_with_total = pd.concat([capital_df_with_total, total_row], ignore_index=True)
+
+    # Rename columns for great_tables
+    capital_df_with_total.columns = ['School Name', 'Immediate (within 5 years)', 'Total']
+
+    # Convert to polars for great_tables
+    capital_df_pl = pl.from_pandas(capital_df_with_total)
+
+    # Create great_tables capital table
+    capital_table = (
+        GT(capital_df_pl, id="capital_report")
+        .tab_header(f"{district_name} - CPS School Capital Needs")
+        .fmt_currency(
+            columns=["Immediate (within 5 years)", "Total"],
+            decimals=0,
+        )
+        .sub_missing(missing_text="")
+        .tab_style(
+            style=style.text(weight="bold"),
+            locations=loc.body(rows=pl.col("School Name").str.contains("Total"))
+        )
+        .cols_width({
+            "School Name": "250px",
+            "Immediate (within 5 years)": "150px",
+            "Total": "150px"
+        })
+    )
+
+    # Get HTML content from great_tables
+    html_content = capital_table._repr_html_()
+
+    # Create complete HTML document
+    full_html = f"""
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <meta charset="utf-8">
+        <style>
+            body {{ margin: 0; padding: 20px; font-family: Arial, sans-serif; }}
+            table {{ page-break-inside: avoid; }}
+        </style>
+    </head>
+    <body>
+        {html_content}
+        <div style="margin-top: 30px; font-size: 12px; color: #666;">
+            Data version {data_version}
+        </div>
+    </body>
+    </html>
+    """
+
+    return full_html.encode('utf-8')
+
+
+def build_cuts_report_html(rows, totals, district_name, data_version):
+    """Budget cuts report for one geography as a standalone HTML document (bytes)"""
+    pl, GT, loc, style = load_report_stack()
+    # REMOVING CTU layoff (8/11/25)
+    # available_columns = ['School Name', 'Total FY25', 'Position loss/gain (budgeted)', 'Position loss/gain (% of FY25 positions)', 
+    #                    'Total CTU','CTU layoffs (budgeted)', 'CTU layoffs (% of CTU positions)', 
+    #                    'Total SPED','SPED position loss/gain (budgeted)', 'SPED position loss/gain (% of FY25 SPED positions)']
+
+    # Create cuts dataframe with totals (need to include baseline columns)
+    # First check which columns are available
+    available_columns = ['School Name', 'Total FY25', 'Position loss/gain (budgeted)', 'Position loss/gain (% of FY25 positions)',
+                       'Total SPED','SPED position loss/gain (budgeted)', 'SPED position loss/gain (% of FY25 SPED positions)',
+                       'Total teachers FY25', 'Teacher positions loss/gain (budgeted)', 'Teacher positions loss/gain (% of FY25)']              
+    # Totals row (sums and recalculated percentages) comes from the precomputed aggregates
+    totals_row = pd.DataFrame([{col: totals[col] for col in available_columns if col != 'School Name'}])
+    totals_row['School Name'] = f"{district_name} Total"
+    cuts_df_with_total = pd.concat([rows, totals_row], ignore_index=True)
+
+
+    # Remove unwanted columns from display
+    cuts_df_with_total = cuts_df_with_total[[
+        'School Name',
+        'Position loss/gain (budgeted)',
+        'Position loss/gain (% of FY25 positions)',
+        'Teacher positions loss/gain (budgeted)',
+        'Teacher positions loss/gain (% of FY25)',
+        # 'CTU layoffs (budgeted)',
+        # 'CTU layoffs (% of CTU positions)',
+        'SPED position loss/gain (budgeted)',
+        'SPED position loss/gain (% of FY25 SPED positions)'
+    ]]
+
+    # Convert to polars for great_tables
+    cuts_df_pl = pl.from_pandas(cuts_df_with_total)
+
+
+
+    # Define column groups for spanners
+    position_cuts_cols = ["Position loss/gain (budgeted)", "Position loss/gain (% of FY25 positions)"]
+    teacher_cuts_cols = ['Teacher positions loss/gain (budgeted)', 'Teacher positions loss/gain (% of FY25)']
+    # removing ctu_cuts_cols = ["CTU layoffs (budgeted)", "CTU layoffs (% of CTU positions)"]
+    sped_cuts_cols = ["SPED position loss/gain (budgeted)", "SPED position loss/gain (% of FY25 SPED positions)"]
+    # removing all_cuts_cols = position_cuts_cols + ctu_cuts_cols + sped_cuts_cols
+    all_cuts_cols = position_cuts_cols + sped_cuts_cols 
+
+    # Create great_tables cuts table
+    cuts_table = (
+        GT(cuts_df_pl, id="cuts_report")
+        .tab_header(f"{district_name} - CPS School Budgeted Position Cuts")
+        .tab_spanner(label="All Staff", columns=position_cuts_cols)
+        .tab_spanner(label="Teachers", columns=teacher_cuts_cols)
+        # removing .tab_spanner(label="CTU Positions", columns=ctu_cuts_cols)
+        .tab_spanner(label="SPED Positions", columns=sped_cuts_cols)
+        .cols_label(
+            **{
+                "Position loss/gain (budgeted)": "Difference",
+                "Position loss/gain (% of FY25 positions)": "% of FY25 Positions",
+                'Teacher positions loss/gain (budgeted)' : "Difference",
+                'Teacher positions loss/gain (% of FY25)': '% of FY25 Teachers',
+                # "CTU layoffs (budgeted)": "Difference",
+                # "CTU layoffs (% of CTU positions)": "% of CTU Positions",
+                "SPED position loss/gain (budgeted)": "Difference",
+                "SPED position loss/gain (% of FY25 SPED positions)": "% of SPED Positions"
+            }
+        )
+        # removed "CTU layoffs (budgeted)",
+        .fmt_number(
+            columns=["Position loss/gain (budgeted)",'Teacher positions loss/gain (budgeted)', "SPED position loss/gain (budgeted)"],
+            decimals=0,
+        )
+        # removed "CTU layoffs (% of CTU positions)"
+        .fmt_percent(
+            columns=["Position loss/gain (% of FY25 positions)",'Teacher positions loss/gain (% of FY25)', "SPED position loss/gain (% of FY25 SPED positions)"],
+            decimals=1,
+        )
+        .sub_missing(missing_text="")
+        # Styling ----
+        .tab_style(
+            style=style.text(color="red"),
+            locations=loc.body(columns=all_cuts_cols)
+        )
+        .tab_style(
+            style=style.text(weight="bold"),
+            locations=loc.body(rows=pl.col("School Name").str.contains("Total"))
+        )
+    )
+
+    # Get HTML content from great_tables
+    html_content = cuts_table._repr_html_()
+
+    # Create complete HTML document
+    full_html = f"""
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <meta charset="utf-8">
+        <style>
+            body {{ margin: 0; padding: 20px; font-family: Arial, sans-serif; }}
+            table {{ page-break-inside: avoid; }}
+        </style>
+    </head>
+    <body>
+        {html_content}
+        <div style="margin-top: 30px; font-size: 12px; color: #666;">
+            Data version {data_version}
+        </div>
+    </body>
+    </html>
+    """
+
+    return full_html.encode('utf-8')
+
+
+def build_report(dataset, report_type, filter_type, geo_key):
+    """One report ("capital" or "cuts") for one sidebar selection, as HTML bytes"""
+    geo_kind = FILTER_KINDS[filter_type]
+    with stage_timing.timer("report", geo_kind):
+        rows = dataset["df"].take(geography_positions(dataset, geo_kind, geo_key))
+        totals = dataset_geography_totals(dataset, geo_kind, geo_key)
+        district_name = describe_geography(dataset["catalog"], filter_type, geo_key)["district_name"]
+        # Stamped with the dataset version rather than the render time: reports are
+        # cached on disk and pre-rendered, so a render time would go stale
+        data_version = dataset["hash"][:12]
+        if report_type == "capital":
+            return build_capital_report_html(rows, totals, district_name, data_version)
+        return build_cuts_report_html(rows, totals, district_name, data_version)
+
+
+def geography_id(geo_kind, geo_key):
+    """Stable string id of a geography (e.g. "district:IL House:1", "ward:14", "selection:union:ward:1+ward:2")"""
+    if geo_kind == "selection":
+        operation, geo_ids = geo_key
+        return f"selection:{operation}:" + "+".join(geo_ids)
+    parts = geo_key if isinstance(geo_key, tuple) else (geo_key,)
+    return ":".join([geo_kind, *(str(part) for part in parts)])
+
+
+# Persistent report cache shared by every server process and kept across restarts.
+# Bump REPORT_TEMPLATE_VERSION whenever the report layout changes.
+REPORT_TEMPLATE_VERSION = 2
+REPORT_CACHE_DIR = os.environ.get(
+    "CPS_REPORT_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".report_cache")
+)
+REPORT_CACHE_MAX_BYTES = int(os.environ.get("CPS_REPORT_CACHE_MAX_MB", "256")) * 2**20
+
+
+def report_cache_path(cache_dir, dataset_hash, report_type, geo_id):
+    """File of one cache entry, keyed by (dataset hash, report type, geography, template version)"""
+    key = json.dumps([dataset_hash, report_type, geo_id, REPORT_TEMPLATE_VERSION])
+    return os.path.join(cache_dir, hashlib.sha256(key.encode("utf-8")).hexdigest() + ".html")
+
+
+def report_cache_get(path):
+    """Cached bytes or None; a hit refreshes the entry's mtime (eviction is least-recently-used)"""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        os.utime(path)
+        return data
+    except OSError:
+        return None
+
+
+def report_cache_put(path, data, max_bytes=REPORT_CACHE_MAX_BYTES):
+    """Atomically store an entry, then evict the least recently used ones above max_bytes"""
+    cache_dir = os.path.dirname(path)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+    entries = []
+    with os.scandir(cache_dir) as it:
+        for entry in it:
+            if entry.name.endswith(".html"):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, entry_path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if entry_path == path:
+            continue
+        try:
+            os.remove(entry_path)
+        except OSError:
+            # Already evicted by another process
+            pass
+        total -= size
+
+
+def cached_report(dataset, report_type, filter_type, geo_key, cache_dir=REPORT_CACHE_DIR):
+    """Report bytes from the on-disk cache, building and storing them on a miss"""
+    geo_id = geography_id(FILTER_KINDS[filter_type], geo_key)
+    path = report_cache_path(cache_dir, dataset["hash"], report_type, geo_id)
+    data = report_cache_get(path)
+    if data is None:
+        data = build_report(dataset, report_type, filter_type, geo_key)
+        try:
+            report_cache_put(path, data)
+        except OSError:
+            # An unwritable cache directory only costs the re-render
+            pass
+    return data
+
+
+# Output of prerender_reports.py: content-addressed HTML files plus manifest.json
+PREBUILT_REPORTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prebuilt_reports")
+PREBUILT_MANIFEST = "manifest.json"
+
+
+@st.cache_resource
+def _read_prebuilt_manifest(path, mtime_ns):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_prebuilt_manifest(reports_dir=PREBUILT_REPORTS_DIR):
+    """Manifest of the batch pre-render, re-read whenever the file changes (None if absent)"""
+    path = os.path.join(reports_dir, PREBUILT_MANIFEST)
+    try:
+        manifest = _read_prebuilt_manifest(path, os.stat(path).st_mtime_ns)
+    except (OSError, ValueError):
+        return None
+    return {**manifest, "dir": reports_dir}
+
+
+def prebuilt_report_path(manifest, dataset_hash, report_type, geo_kind, geo_key):
+    """Path of a pre-rendered report for this dataset version, or None"""
+    if manifest is None or manifest.get("dataset_hash") != dataset_hash:
+        return None
+    file_name = manifest.get("reports", {}).get(report_type, {}).get(geography_id(geo_kind, geo_key))
+    if file_name is None:
+        return None
+    path = os.path.join(manifest["dir"], file_name)
+    return path if os.path.exists(path) else None
+
+
+def read_file_bytes(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+# Main app
+def main():
+    st.title("🏫 CPS Budget Stakes Dashboard")
+    st.markdown("**Filter schools by legislative district to view capital needs and the impact of budget cuts**")
+ 
+    # Dashboard style overrides (colors come from the theme in .streamlit/config.toml)
+    st.markdown(load_stylesheet(), unsafe_allow_html=True)
     
+    # Per-stage timings (?debug=1 or CPS_STAGE_TIMING=1); the env var also logs every sample to stderr
+    rerun_started = time.perf_counter()
+    stage_timing.LOG = env_flag("CPS_STAGE_TIMING")
+
     # Load data
-    df = load_data()
-    if df is None:
+    dataset = load_data()
+    if dataset is None:
         return
+    load_seconds = time.perf_counter() - rerun_started
+    catalog = dataset["catalog"]
+    if env_flag("CPS_PRECOMPUTE_EXPORTS"):
+        start_export_precompute(dataset, dataset["hash"])
+
+    # School search by name or School ID, answered from the prebuilt search index
+    query = st.text_input("🔎 Find a school", placeholder="School name or School ID")
+    if query:
+        found = search_schools(dataset["search"], query)
+        if len(found) > 0:
+            st.dataframe(search_results(dataset["search"], found), hide_index=True)
+        else:
+            st.info("No schools match your search.")
     
     # Sidebar filters
     st.sidebar.header("🔍 Filters")
@@ -866,58 +2156,47 @@ def main():
     # Filter options
     filter_type = st.sidebar.radio(
         "Filter by:",
-        ["Chamber & District", "Legislator Name","Ward", "Adler Name"]
+        ["Chamber & District", "Legislator Name","Ward", "Adler Name", "Multiple Geographies"]
     )
     
     if filter_type == "Chamber & District":
         # Chamber selection
-        chambers = sorted(df['Chamber'].unique())
+        chambers = catalog["chambers"]
         selected_chamber = st.sidebar.selectbox("Select ILGA Chamber:", chambers)
         
         # District selection (filtered by chamber)
-        available_districts = sorted(df[df['Chamber'] == selected_chamber]['District'].unique())
+        available_districts = catalog["districts"][selected_chamber]
         selected_district = st.sidebar.selectbox("Select by District:", available_districts)
-        
-        # Filter data
-        filtered_df = df[(df['Chamber'] == selected_chamber) & (df['District'] == selected_district)]
-        # Drop duplicates of school id (this was an issue with wards -- adding it to others)
-        filtered_df = filtered_df.drop_duplicates(subset=['School ID'])
-        
-        # Display selection
-        st.subheader(f"📊 {filtered_df['Legislator'].values[0]} ({selected_chamber} District {selected_district})")
+        geo_key = (selected_chamber, selected_district)
 
     elif filter_type == "Legislator Name":  # Filter by Legislator
         # Legislator selection
-        legislators = sorted(df['Legislator'].dropna().unique())
-        selected_legislator = st.sidebar.selectbox("Select by Legislator:", legislators)
-        
-        # Filter data
-        filtered_df = df[df['Legislator'] == selected_legislator]
-        # Drop duplicates of school id (this was an issue with wards -- adding it to others)
-        filtered_df = filtered_df.drop_duplicates(subset=['School ID'])
-        
-        # Display selection
-        legislator_info = filtered_df.iloc[0]
-        st.subheader(f"📊 {selected_legislator} ({legislator_info['Chamber']} District {legislator_info['District']})")
+        legislators = catalog["legislators"]
+        geo_key = st.sidebar.selectbox("Select by Legislator:", legislators)
     elif filter_type == "Ward":
-        wards = sorted(df['Ward Number'].dropna().unique())
-#        alder = df[df['Ward Number'].isin(wards)]['alderman'].unique()
-        selected_ward = st.sidebar.selectbox("Select Ward:", wards)
-        
-        filtered_df = df[df['Ward Number'] == selected_ward]
-        # Drop duplicates of school id (this was an issue with wards -- adding it to others)
-        filtered_df = filtered_df.drop_duplicates(subset=['School ID'])
-        # Display selection
-        st.subheader(f"📊 {filtered_df['alderman'].values[0]} (Ward - {selected_ward})")
+        wards = catalog["wards"]
+        geo_key = st.sidebar.selectbox("Select Ward:", wards)
+    elif filter_type == "Adler Name":
+        adlers = catalog["aldermen"]
+        geo_key = st.sidebar.selectbox("Select Adler by Name:", adlers)
     else:
-        adlers = sorted(df['alderman'].dropna().unique())
-        selected_adler = st.sidebar.selectbox("Select Adler by Name:", adlers)
+        # Any mix of districts and wards, combined as a union or an intersection
+        selection_labels = catalog["selection_labels"]
+        geo_ids = st.sidebar.multiselect("Select districts and wards:", list(selection_labels),
+                                         format_func=selection_labels.get)
+        operation = st.sidebar.radio("Combine:", list(SELECTION_OPERATIONS),
+                                     format_func=lambda op: "Schools in any (union)" if op == "union" else "Schools in all (intersection)")
+        geo_key = (operation, tuple(geo_ids))
+
+    # Metrics, tables and names of the selection come from the process-wide view cache;
+    # the rows themselves are only selected when a CSV or report is actually built
+    geo_kind = FILTER_KINDS[filter_type]
+    stage_timing.record("load", geo_kind, load_seconds)
+    view = get_geography_view(dataset, filter_type, geo_key)
+    filename_prefix = view["filename_prefix"]
 
-        filtered_df = df[df['alderman'] == selected_adler]
-        # Drop duplicates of school id (this was an issue with wards -- adding it to others)
-        filtered_df = filtered_df.drop_duplicates(subset=['School ID'])
-        # Display selection
-        st.subheader(f"📊 {filtered_df['alderman'].values[0]} (Ward - {filtered_df['Ward Number'].values[0]})")
+    # Display selection
+    st.subheader(view["subheader"])
 
 
     # REMOVED CTU layoff (8/11/25)
@@ -953,105 +2232,42 @@ def main():
     st.sidebar.markdown("---")
     st.sidebar.subheader("📥 Download Data")
     
-    if len(filtered_df) > 0:
-        # Prepare data for downloads
-        all_data_df = filtered_df.copy()
-        
-        # Create district name for files
-        if filter_type == "Chamber & District":
-            district_name = f"{selected_chamber} District {selected_district}"
-            filename_prefix = f"{selected_chamber.replace(' ', '_')}_District_{selected_district}"
-        elif filter_type == "Legislator Name":
-            # Get chamber and district info from filtered data
-            legislator_info = filtered_df.iloc[0]
-            district_name = f"{legislator_info['Chamber']} District {legislator_info['District']}"
-            filename_prefix = f"{legislator_info['Chamber'].replace(' ', '_')}_District_{legislator_info['District']}"
-        elif filter_type == "Ward":
-            # Ward selection
-            district_name = f"Ward {selected_ward}"
-            filename_prefix = f"Ward_{selected_ward}"
-        else:  # Adler Name
-            district_name = f"Ward {filtered_df['Ward Number'].values[0]}"
-            filename_prefix = f"Ward_{filtered_df['Ward Number'].values[0]}"
-
-        # CSV download of all data (NO COLUMNS - just direct sidebar)
-        all_csv = all_data_df.to_csv(index=False)
+    if view["schools"] > 0:
+        # CSV download of all data (NO COLUMNS - just direct sidebar). The CSV is only
+        # serialized when the button is clicked, then memoized for the geography.
+        export_cache = get_export_cache()
         st.sidebar.download_button(
             label="📊 Download District Data (CSV)",
-            data=all_csv,
+            data=lambda: cached_geography_csv(export_cache, dataset, geo_kind, geo_key),
             file_name=f"{filename_prefix}_all_data.csv",
             mime="text/csv",
             help="Download all capital and operations data as CSV"
         )
         
-        if st.sidebar.button("📋 Generate Capital Needs Report", help="Create formatted report of capital needs data"):
+        # Reports are served straight from the batch pre-render (prerender_reports.py) when it
+        # covers this dataset version; otherwise they are generated on click through the
+        # persistent report cache
+        prebuilt = load_prebuilt_manifest()
+        prebuilt_capital = prebuilt_report_path(prebuilt, dataset["hash"], "capital", geo_kind, geo_key)
+        prebuilt_cuts = prebuilt_report_path(prebuilt, dataset["hash"], "cuts", geo_kind, geo_key)
+
+        if prebuilt_capital is not None:
+            st.sidebar.download_button(
+                label="⬇️ Download Capital Report",
+                data=lambda: read_file_bytes(prebuilt_capital),
+                file_name=f"{filename_prefix}_capital_report.html",
+                mime="text/html",
+                help="Pre-rendered capital needs report"
+            )
+        elif st.sidebar.button("📋 Generate Capital Needs Report", help="Create formatted report of capital needs data"):
             with st.spinner("Generating Capital Report..."):
                 try:
-                    # Add district total row to filtered_df
-                    capital_df_with_total = filtered_df[['School Name', 'Immediate Capital Needs', 'Total Capital Needs']].copy()
-                    
-                    # Create district total row
-                    total_row = pd.DataFrame([[
-                        f"{district_name} Total",
-                        capital_df_with_total['Immediate Capital Needs'].sum(),
-                        capital_df_with_total['Total Capital Needs'].sum()
-                    ]])
-                    total_row.columns = capital_df_with_total.columns
-                    capital_df_with_total = pd.concat([capital_df_with_total, total_row], ignore_index=True)
-                    
-                    # Rename columns for great_tables
-                    capital_df_with_total.columns = ['School Name', 'Immediate (within 5 years)', 'Total']
-                    
-                    # Convert to polars for great_tables
-                    capital_df_pl = pl.from_pandas(capital_df_with_total)
-                    
-                    # Create great_tables capital table
-                    capital_table = (
-                        GT(capital_df_pl)
-                        .tab_header(f"{district_name} - CPS School Capital Needs")
-                        .fmt_currency(
-                            columns=["Immediate (within 5 years)", "Total"],
-                            decimals=0,
-                        )
-                        .sub_missing(missing_text="")
-                        .tab_style(
-                            style=style.text(weight="bold"),
-                            locations=loc.body(rows=pl.col("School Name").str.contains("Total"))
-                        )
-                        .cols_width({
-                            "School Name": "250px",
-                            "Immediate (within 5 years)": "150px",
-                            "Total": "150px"
-                        })
-                    )
-                    
-                    # Get HTML content from great_tables
-                    html_content = capital_table._repr_html_()
-                    
-                    # Create complete HTML document
-                    full_html = f"""
-                    <!DOCTYPE html>
-                    <html>
-                    <head>
-                        <meta charset="utf-8">
-                        <style>
-                            body {{ margin: 0; padding: 20px; font-family: Arial, sans-serif; }}
-                            table {{ page-break-inside: avoid; }}
-                        </style>
-                    </head>
-                    <body>
-                        {html_content}
-                        <div style="margin-top: 30px; font-size: 12px; color: #666;">
-                            Report generated on {pd.Timestamp.now().strftime('%B %d, %Y at %I:%M %p')}
-                        </div>
-                    </body>
-                    </html>
-                    """
+                    capital_report = cached_report(dataset, "capital", filter_type, geo_key)
                     
                     # Create download button for HTML
                     st.sidebar.download_button(
                         label="⬇️ Download Capital Report",
-                        data=full_html.encode('utf-8'),
+                        data=capital_report,
                         file_name=f"{filename_prefix}_capital_report.html",
                         mime="text/html"
                     )
@@ -1062,132 +2278,23 @@ def main():
                 except Exception as e:
                     st.sidebar.error(f"❌ Error generating report: {str(e)}")
 
-        if st.sidebar.button("📋 Generate Budget Cuts Report", help="Create formatted report of CPS proposed FY26 budget data and cuts"):
+        if prebuilt_cuts is not None:
+            st.sidebar.download_button(
+                label="⬇️ Download Cuts Report",
+                data=lambda: read_file_bytes(prebuilt_cuts),
+                file_name=f"{filename_prefix}_cuts_report.html",
+                mime="text/html",
+                help="Pre-rendered budget cuts report"
+            )
+        elif st.sidebar.button("📋 Generate Budget Cuts Report", help="Create formatted report of CPS proposed FY26 budget data and cuts"):
             with st.spinner("Generating Cuts Report..."):
                 try:
-                    # REMOVING CTU layoff (8/11/25)
-                    # available_columns = ['School Name', 'Total FY25', 'Position loss/gain (budgeted)', 'Position loss/gain (% of FY25 positions)', 
-                    #                    'Total CTU','CTU layoffs (budgeted)', 'CTU layoffs (% of CTU positions)', 
-                    #                    'Total SPED','SPED position loss/gain (budgeted)', 'SPED position loss/gain (% of FY25 SPED positions)']
-
-                    # Create cuts dataframe with totals (need to include baseline columns)
-                    # First check which columns are available
-                    available_columns = ['School Name', 'Total FY25', 'Position loss/gain (budgeted)', 'Position loss/gain (% of FY25 positions)',
-                                       'Total SPED','SPED position loss/gain (budgeted)', 'SPED position loss/gain (% of FY25 SPED positions)',
-                                       'Total teachers FY25', 'Teacher positions loss/gain (budgeted)', 'Teacher positions loss/gain (% of FY25)']              
-                    # Create a totals row by summing all columns that aren't School Name
-                    totals_row = filtered_df[available_columns].sum(numeric_only=True)
-                    totals_row['School Name'] = f"{district_name} Total"
-                    totals_row = pd.DataFrame(totals_row).T
-                    # Recaululate percentages for totals
-
-                    # removing totals_row['CTU layoffs (% of CTU positions)'] = abs(totals_row['CTU layoffs (budgeted)']) / totals_row['Total CTU']
-
-
-                    totals_row['Position loss/gain (% of FY25 positions)'] = abs(totals_row['Position loss/gain (budgeted)']) / totals_row['Total FY25']
-
-                    totals_row['Teacher positions loss/gain (% of FY25)'] = abs(totals_row['Teacher positions loss/gain (budgeted)']) / totals_row['Total teachers FY25']
-                     
-                    totals_row['SPED position loss/gain (% of FY25 SPED positions)'] = abs(totals_row['SPED position loss/gain (budgeted)']) / totals_row['Total SPED']
-                    cuts_df_with_total = pd.concat([filtered_df, totals_row], ignore_index=True)
-
-                    
-                    # Remove unwanted columns from display
-                    cuts_df_with_total = cuts_df_with_total[[
-                        'School Name',
-                        'Position loss/gain (budgeted)',
-                        'Position loss/gain (% of FY25 positions)',
-                        'Teacher positions loss/gain (budgeted)',
-                        'Teacher positions loss/gain (% of FY25)',
-                        # 'CTU layoffs (budgeted)',
-                        # 'CTU layoffs (% of CTU positions)',
-                        'SPED position loss/gain (budgeted)',
-                        'SPED position loss/gain (% of FY25 SPED positions)'
-                    ]]
-
-                    # Convert to polars for great_tables
-                    cuts_df_pl = pl.from_pandas(cuts_df_with_total)
-                    
-                    
-                    
-                    # Define column groups for spanners
-                    position_cuts_cols = ["Position loss/gain (budgeted)", "Position loss/gain (% of FY25 positions)"]
-                    teacher_cuts_cols = ['Teacher positions loss/gain (budgeted)', 'Teacher positions loss/gain (% of FY25)']
-                    # removing ctu_cuts_cols = ["CTU layoffs (budgeted)", "CTU layoffs (% of CTU positions)"]
-                    sped_cuts_cols = ["SPED position loss/gain (budgeted)", "SPED position loss/gain (% of FY25 SPED positions)"]
-                    # removing all_cuts_cols = position_cuts_cols + ctu_cuts_cols + sped_cuts_cols
-                    all_cuts_cols = position_cuts_cols + sped_cuts_cols 
-                    
-                    # Create great_tables cuts table
-                    cuts_table = (
-                        GT(cuts_df_pl)
-                        .tab_header(f"{district_name} - CPS School Budgeted Position Cuts")
-                        .tab_spanner(label="All Staff", columns=position_cuts_cols)
-                        .tab_spanner(label="Teachers", columns=teacher_cuts_cols)
-                        # removing .tab_spanner(label="CTU Positions", columns=ctu_cuts_cols)
-                        .tab_spanner(label="SPED Positions", columns=sped_cuts_cols)
-                        .cols_label(
-                            **{
-                                "Position loss/gain (budgeted)": "Difference",
-                                "Position loss/gain (% of FY25 positions)": "% of FY25 Positions",
-                                'Teacher positions loss/gain (budgeted)' : "Difference",
-                                'Teacher positions loss/gain (% of FY25)': '% of FY25 Teachers',
-                                # "CTU layoffs (budgeted)": "Difference",
-                                # "CTU layoffs (% of CTU positions)": "% of CTU Positions",
-                                "SPED position loss/gain (budgeted)": "Difference",
-                                "SPED position loss/gain (% of FY25 SPED positions)": "% of SPED Positions"
-                            }
-                        )
-                        # removed "CTU layoffs (budgeted)",
-                        .fmt_number(
-                            columns=["Position loss/gain (budgeted)",'Teacher positions loss/gain (budgeted)', "SPED position loss/gain (budgeted)"],
-                            decimals=0,
-                        )
-                        # removed "CTU layoffs (% of CTU positions)"
-                        .fmt_percent(
-                            columns=["Position loss/gain (% of FY25 positions)",'Teacher positions loss/gain (% of FY25)', "SPED position loss/gain (% of FY25 SPED positions)"],
-                            decimals=1,
-                        )
-                        .sub_missing(missing_text="")
-                        # Styling ----
-                        .tab_style(
-                            style=style.text(color="red"),
-                            locations=loc.body(columns=all_cuts_cols)
-                        )
-                        .tab_style(
-                            style=style.text(weight="bold"),
-                            locations=loc.body(rows=pl.col("School Name").str.contains("Total"))
-                        )
-                    )
-                    
-                    # Get HTML content from great_tables
-                    html_content = cuts_table._repr_html_()
-                    
-                    # Create complete HTML document
-                    full_html = f"""
-                    <!DOCTYPE html>
-                    <html>
-                    <head>
-                        <meta charset="utf-8">
-                        <style>
-                            body {{ margin: 0; padding: 20px; font-family: Arial, sans-serif; }}
-                            table {{ page-break-inside: avoid; }}
-                        </style>
-                    </head>
-                    <body>
-                        {html_content}
-                        <div style="margin-top: 30px; font-size: 12px; color: #666;">
-                            Report generated on {pd.Timestamp.now().strftime('%B %d, %Y at %I:%M %p')}
-                        </div>
-                    </body>
-                    </html>
-                    """
-
+                    cuts_report = cached_report(dataset, "cuts", filter_type, geo_key)
                     
                     # Create download button for HTML
                     st.sidebar.download_button(
                         label="⬇️ Download Cuts Report",
-                        data=full_html.encode('utf-8'),
+                        data=cuts_report,
                         file_name=f"{filename_prefix}_cuts_report.html",
                         mime="text/html"
                     )
@@ -1198,273 +2305,116 @@ def main():
                 except Exception as e:
                     st.sidebar.error(f"❌ Error generating report: {str(e)}")
     
+    # Opt-in memory report (?memory=1 or CPS_MEMORY_REPORT=1)
+    if option_enabled("memory", "CPS_MEMORY_REPORT"):
+        show_memory_report(dataset)
+
+    # Admin panel with the load-time validation report (?admin=1 or CPS_ADMIN_PANEL=1)
+    if option_enabled("admin", "CPS_ADMIN_PANEL"):
+        show_validation_report(dataset["validation"])
+        show_dataset_status(get_dataset_manager())
+
     # Create tabs for data display
     # tab1, tab2, tab3 = st.tabs(["💰 Capital Needs ", " 🏢 Operations & Positions ", " ✂️ Cuts "])
-    tab1, tab3 = st.tabs(["💰 Capital Needs "," ✂️ Cuts "])
+    tab1, tab3, tab4, tab5, tab6 = st.tabs(["💰 Capital Needs "," ✂️ Cuts ", " 🧮 What-if Cuts ", " 🏆 Leaderboard ", " 🗺️ Overlap "])
 
-    # Format currency and numbers functions
-    def format_currency(val):
-        if pd.isna(val):
-            return ""
-        return f"${val:,.0f}"
-    
-    def format_positions(val):
-        if pd.isna(val):
-            return ""
-        return f"{val:.1f}"
-    
     with tab1:
         st.subheader("Capital Needs by School")
         
-        # Define capital columns
-        capital_columns = [
-            'School Name',
-            'Immediate Capital Needs',
-            'Total Capital Needs'
-        ]
-        
-        # Create capital display dataframe
-        capital_df = filtered_df[capital_columns].copy()
-        
-        # Rename columns for display
-        capital_df.columns = [
-            "School Name",
-            "Immediate (within 5 years)",
-            "Total Capital Needs"
-        ]
-        
-        # Calculate totals for capital
-        capital_totals = {}
-        capital_totals['School Name'] = 'TOTAL'
-        capital_totals['Immediate (within 5 years)'] = capital_df['Immediate (within 5 years)'].sum()
-        capital_totals['Total Capital Needs'] = capital_df['Total Capital Needs'].sum()
-        
-        # Add totals row
-        capital_totals_df = pd.DataFrame([capital_totals])
-        capital_final_df = pd.concat([capital_df, capital_totals_df], ignore_index=True)
-        
-        # Format currency
-        for col in ['Immediate (within 5 years)', 'Total Capital Needs']:
-            capital_final_df[col] = capital_final_df[col].apply(format_currency)
-        
         # Display capital metrics
-        if len(filtered_df) > 0:
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.metric("Schools", len(filtered_df))
-            with col2:
-                st.metric("Immediate Capital Needs", format_currency(capital_totals['Immediate (within 5 years)']))
-            with col3:
-                st.metric("Total Capital Needs", format_currency(capital_totals['Total Capital Needs']))
+        if view["schools"] > 0:
+            for column, (label, value) in zip(st.columns(3), view["capital_metrics"]):
+                with column:
+                    st.metric(label, value)
         
-        if len(filtered_df) > 0:
-            # Create custom HTML table for capital data
-            def create_html_table_capital(df):
-                html = """
-                <style>
-                .custom-table-capital {
-                    border-collapse: collapse;
-                    width: 100%;
-                    font-family: 'Source Sans Pro', sans-serif;
-                    font-size: 14px;
-                    margin: 0 !important;
-                }
-                .custom-table-capital thead {
-                    position: sticky;
-                    top: 0;
-                    z-index: 10;
-                    background-color: white;
-                }
-                .custom-table-capital th {
-                    background-color: white !important;
-                    font-weight: bold !important;
-                    text-align: center !important;
-                    padding: 10px;
-                    border: 1px solid #ddd;
-                    color: black !important;
-                    position: sticky;
-                    top: 0;
-                }
-                .custom-table-capital td {
-                    padding: 8px 10px;
-                    border: 1px solid #ddd;
-                    text-align: center;
-                }
-                .custom-table-capital td:first-child {
-                    text-align: left;
-                }
-                .custom-table-capital tr:last-child {
-                    background-color: #f0f0f0;
-                    font-weight: bold;
-                }
-                </style>
-                <div style="max-height: 400px; overflow-y: auto; border: 1px solid #ddd; width: 100%;">
-                <table class="custom-table-capital">
-                <thead><tr>
-                """
-                
-                # Add headers
-                for col in df.columns:
-                    html += f"<th>{col}</th>"
-                html += "</tr></thead><tbody>"
-                
-                # Add data rows
-                for idx, row in df.iterrows():
-                    html += "<tr>"
-                    for col in df.columns:
-                        value = row[col]
-                        html += f'<td>{value}</td>'
-                    html += "</tr>"
-                
-                html += "</tbody></table></div>"
-                return html
-            
+        if view["schools"] > 0:
             # Display custom HTML table for CAPITAL data
-            st.markdown(create_html_table_capital(capital_final_df), unsafe_allow_html=True)
+            st.markdown(view["capital_html"], unsafe_allow_html=True)
             
         else:
             st.warning("No schools found for the selected criteria.")
     
     with tab3:
         st.subheader("Budgeted Cuts by School")
-        # Define cuts columns        
-        
-        # removing 'Total CTU','CTU layoffs (budgeted)', 'CTU layoffs (% of CTU positions)',
-        available_columns = ['School Name', 'Total FY25', 'Position loss/gain (budgeted)', 'Position loss/gain (% of FY25 positions)','Total teachers FY25','Teacher positions loss/gain (budgeted)',  
-        'Teacher positions loss/gain (% of FY25)',
-                                       'Total SPED','SPED position loss/gain (budgeted)', 'SPED position loss/gain (% of FY25 SPED positions)']
-                    
-        # Create a totals row by summing all columns that aren't School Name
-        totals_row = filtered_df[available_columns].sum(numeric_only=True)
-        totals_row['School Name'] = f"{district_name} Total"
-        totals_row = pd.DataFrame(totals_row).T
-        # Recaululate percentages for totals
-        totals_row['Position loss/gain (% of FY25 positions)'] = abs(totals_row['Position loss/gain (budgeted)'] / totals_row['Total FY25'])
-        totals_row['Teacher positions loss/gain (% of FY25)'] = abs(totals_row['Teacher positions loss/gain (budgeted)'] / totals_row['Total teachers FY25'])
-        # removing totals_row['CTU layoffs (% of CTU positions)'] = abs(totals_row['CTU layoffs (budgeted)'] / totals_row['Total CTU'])
-        totals_row['SPED position loss/gain (% of FY25 SPED positions)'] = abs(totals_row['SPED position loss/gain (budgeted)'] / totals_row['Total SPED'])
-        cuts_df_with_total = pd.concat([filtered_df, totals_row], ignore_index=True)
-
-        # Remove unwanted columns from display
-        cuts_df_with_total = cuts_df_with_total[[
-            'School Name',
-            'Position loss/gain (budgeted)',
-            'Position loss/gain (% of FY25 positions)',
-            'Teacher positions loss/gain (budgeted)',
-            'Teacher positions loss/gain (% of FY25)',
-            # 'CTU layoffs (budgeted)',
-            # 'CTU layoffs (% of CTU positions)',
-            'SPED position loss/gain (budgeted)',
-            'SPED position loss/gain (% of FY25 SPED positions)'
-        ]]
-        
-        # Format Position loss/gain (budgeted), CTU layoffs (budgeted), and SPED position loss/gain (budgeted) as integers. If missing than blank.
-        # removing'CTU layoffs (budgeted)', 'CTU layoffs (% of CTU positions)', 
-        number_cols = ['Position loss/gain (budgeted)', 'Teacher positions loss/gain (budgeted)','SPED position loss/gain (budgeted)']
-        perc_cols = ['Position loss/gain (% of FY25 positions)','Teacher positions loss/gain (% of FY25)','SPED position loss/gain (% of FY25 SPED positions)']
-        
-        formatted_cuts_df = cuts_df_with_total.copy()
-        for col in perc_cols:
-            formatted_cuts_df[col] = formatted_cuts_df[col].apply(lambda x: f"{x:.2%}" if pd.notna(x) else "")
-
-        for col in number_cols:
-            formatted_cuts_df[col] = formatted_cuts_df[col].apply(lambda x: f"{int(x):,}" if pd.notna(x) else "")
 
         # Display cuts metrics (just sums)
-        if len(filtered_df) > 0:
-            col1, col2, col3, col4,col5,col6 = st.columns(6)
-            with col1:
-                position_change = cuts_df_with_total.iloc[-1]['Position loss/gain (budgeted)']
-                st.metric("Total Position Loss/Gain", f"{position_change:,.0f}")
-            with col2:
-                position_perc = abs(cuts_df_with_total.iloc[-1]['Position loss/gain (% of FY25 positions)'])
-                st.metric("% of Positions", f"{position_perc:,.0%}")
-            with col3:
-                position_perc = abs(cuts_df_with_total.iloc[-1]['Teacher positions loss/gain (budgeted)'])
-                st.metric("Total Position Loss/Gain", f"{position_change:,.0f}")
-            with col4:
-                position_perc = abs(cuts_df_with_total.iloc[-1]['Teacher positions loss/gain (% of FY25)'])
-                st.metric("% of Positions", f"{position_perc:,.0%}")
-            with col5:
-                sped_change = cuts_df_with_total.iloc[-1]['SPED position loss/gain (budgeted)']
-                st.metric("SPED Position Loss/Gain", f"{sped_change:,.0f}")
-            with col6:
-                sped_perc = abs(cuts_df_with_total.iloc[-1]['SPED position loss/gain (% of FY25 SPED positions)'])
-                st.metric("% of SPED Positions", f"{sped_perc:,.0%}")
-        # Create and display the cuts table
-        if len(filtered_df) > 0:
-            # Create a custom HTML table for cuts data similar to operations. Make positions number int and % as 0.00%
-            def create_html_table_cuts(df):
-                # removed '% of CTU Positions', 
-                cut2_columns = ['% of FY25 SPED Positions','% of FY25 Teachers', '% of FY25 Positions']
-                
-                html = """
-                <style>
-                .custom-table {
-                    border-collapse: collapse;
-                    width: 100%;
-                    font-family: 'Source Sans Pro', sans-serif;
-                    font-size: 14px;
-                    margin: 0 !important;
-                }
-                .custom-table thead {
-                    position: sticky;
-                    top: 0;
-                    z-index: 10;
-                    background-color: white;
-                }
-                .custom-table th {
-                    background-color: white !important;
-                    font-weight: bold !important;
-                    text-align: center !important;
-                    padding: 10px;
-                    border: 1px solid #ddd;
-                    color: black !important;
-                    position: sticky;
-                    top: 0;
-                }
-                .custom-table td {
-                    padding: 8px 10px;
-                    border: 1px solid #ddd;
-                    text-align: center;
-                }
-                .custom-table td:first-child {
-                    text-align: left;
-                }
-                .custom-table tr:last-child {
-                    background-color: #f0f0f0;
-                    font-weight: bold;
-                }
-                .cut2-column {
-                    color: red !important;
-                    font-weight: bold;
-                }
-                </style>
-                <div style="max-height: 400px; overflow-y: auto; border: 1px solid #ddd; width: 100%;">
-                <table class="custom-table">
-                <thead><tr>
-                """
-                
-                # Add headers
-                for col in df.columns:
-                    html += f"<th>{col}</th>"
-                html += "</tr></thead><tbody>"
-                
-                # Add data rows
-                for idx, row in df.iterrows():
-                    html += "<tr>"
-                    for col in df.columns:
-                        value = row[col]
-                        css_class = "cut2-column" if col in cut2_columns else ""
-                        html += f'<td class="{css_class}">{value}</td>'
-                    html += "</tr>"
-                
-                html += "</tbody></table></div>"
-                return html
-            
-            # Display custom HTML table
-            st.markdown(create_html_table_cuts(formatted_cuts_df), unsafe_allow_html=True) 
+        if view["schools"] > 0:
+            for column, (label, value) in zip(st.columns(6), view["cuts_metrics"]):
+                with column:
+                    st.metric(label, value)
+        # Display the cuts table
+        if view["schools"] > 0:
+            st.markdown(view["cuts_html"], unsafe_allow_html=True)
         else:
             st.warning("No schools found for the selected criteria.")
+
+    with tab4:
+        st.subheader("What-if Operations Cuts by School")
+
+        # Operations dollars and positions lost if every school's budget were cut by the same rate
+        rate_pct = st.slider("Operations cut (%)", 0, SCENARIO_MAX_RATE, SCENARIO_DEFAULT_RATE,
+                             help="Share of each school's FY25 operational budget and positions cut")
+        if view["schools"] > 0:
+            scenario = get_scenario_view(dataset, filter_type, geo_key, rate_pct)
+            for column, (label, value) in zip(st.columns(3), scenario["metrics"]):
+                with column:
+                    st.metric(label, value)
+            st.markdown(scenario["html"], unsafe_allow_html=True)
+        else:
+            st.warning("No schools found for the selected criteria.")
+
+        # Every geography of this filter mode across the rate grid, sliced from the cached cube.
+        # Only sent when asked for: hidden tabs and collapsed expanders are sent on every rerun.
+        st.subheader("Sensitivity by Geography")
+        if st.toggle("Show sensitivity heatmap and table", help="Amounts cut per geography at every rate from 0-25%"):
+            measure = st.selectbox("Measure:", list(SENSITIVITY_MEASURES))
+            # Multi-geography selections compare every district
+            sensitivity = get_sensitivity_view(dataset, geo_kind if geo_kind in dataset["sensitivity"] else "district", measure)
+            st.vega_lite_chart(sensitivity["long"], sensitivity["spec"], width="stretch")
+            with st.expander("📋 Sensitivity table"):
+                st.dataframe(sensitivity["table"])
+        st.download_button(
+            label="⬇️ Download Sensitivity Cube (NumPy .npz)",
+            data=lambda: sensitivity_npz(dataset),
+            file_name="cps_cut_sensitivity.npz",
+            mime="application/octet-stream",
+            help="Amounts cut per geography, measure and rate (0-25%) for every filter mode"
+        )
+
+    with tab5:
+        st.subheader("Leaderboard")
+
+        # Rankings are precomputed per dataset; the widgets only pick a slice
+        group_column, metric_column = st.columns(2)
+        with group_column:
+            group = st.selectbox("Rank:", list(LEADERBOARD_GROUPS))
+        with metric_column:
+            metric = st.selectbox("By:", list(LEADERBOARD_METRICS))
+        leaderboard = dataset["leaderboards"][group]
+        top_n = st.slider("Show top:", 1, len(leaderboard["table"]), min(10, len(leaderboard["table"])))
+        st.dataframe(leaderboard_rows(leaderboard, metric, top_n), hide_index=True)
+
+    with tab6:
+        # Precomputed district x ward overlap: which wards share schools with a district and vice versa
+        overlap = overlap_rows(dataset, geo_kind, geo_key)
+        if overlap is None:
+            st.info("Select a single district, legislator, ward or alder to see overlapping geographies.")
+        else:
+            if geo_kind in ("district", "legislator"):
+                st.subheader("Wards Sharing Schools with this District")
+            else:
+                st.subheader("Legislative Districts Sharing Schools with this Ward")
+            st.dataframe(overlap, hide_index=True)
+
+    # Startup timing (?startup=1 or CPS_STARTUP_TIMING=1). With the env var the record is
+    # also logged to stderr as one JSON line once the first render completes.
+    if startup_timing.record_first_render() and env_flag("CPS_STARTUP_TIMING"):
+        print(json.dumps({"event": "startup", **startup_timing.timings()}), file=sys.stderr)
+    if option_enabled("startup", "CPS_STARTUP_TIMING"):
+        show_startup_timing(startup_timing.timings())
+
+    stage_timing.record("rerun", geo_kind, time.perf_counter() - rerun_started)
+    if option_enabled("debug", "CPS_STAGE_TIMING"):
+        show_stage_timing(stage_timing.summary())
 if __name__ == "__main__":
     main()
\ No newline at end of file
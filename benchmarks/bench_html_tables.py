@@ -0,0 +1,110 @@
+"""Compare the vectorized HTML table renderer with the old iterrows implementation
+
+Usage: python benchmarks/bench_html_tables.py [--repeat N]
+
+Runs both renderers on the largest single geography and on a citywide view of
+every school, checks that the output is byte-identical and prints timings.
+"""
+import argparse
+import os
+import sys
+import timeit
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app  # noqa: E402
+
+
+# Old implementations (iterrows + string concatenation), kept for comparison
+def legacy_html_table_capital(df):
+    html = app.CAPITAL_TABLE_HEADER
+    for col in df.columns:
+        html += f"<th>{col}</th>"
+    html += "</tr></thead><tbody>"
+    for idx, row in df.iterrows():
+        html += "<tr>"
+        for col in df.columns:
+            value = row[col]
+            html += f'<td>{value}</td>'
+        html += "</tr>"
+    html += "</tbody></table></div>"
+    return html
+
+
+def legacy_html_table_cuts(df):
+    html = app.CUTS_TABLE_HEADER
+    for col in df.columns:
+        html += f"<th>{col}</th>"
+    html += "</tr></thead><tbody>"
+    for idx, row in df.iterrows():
+        html += "<tr>"
+        for col in df.columns:
+            value = row[col]
+            css_class = "cut2-column" if col in app.CUTS_HIGHLIGHT_COLUMNS else ""
+            html += f'<td class="{css_class}">{value}</td>'
+        html += "</tr>"
+    html += "</tbody></table></div>"
+    return html
+
+
+def currency(val):
+    return "" if pd.isna(val) else f"${val:,.0f}"
+
+
+def capital_frame(rows):
+    """Formatted capital table with a TOTAL row, as tab1 displays it"""
+    capital = rows[['School Name', 'Immediate Capital Needs', 'Total Capital Needs']]
+    total = pd.DataFrame([{
+        'School Name': 'TOTAL',
+        'Immediate Capital Needs': capital['Immediate Capital Needs'].sum(),
+        'Total Capital Needs': capital['Total Capital Needs'].sum(),
+    }])
+    capital = pd.concat([capital, total], ignore_index=True)
+    for col in ['Immediate Capital Needs', 'Total Capital Needs']:
+        capital[col] = capital[col].apply(currency)
+    return capital
+
+
+def cuts_frame(rows):
+    """Formatted cuts table with a TOTAL row, as tab3 displays it"""
+    number_cols = ['Position loss/gain (budgeted)', 'Teacher positions loss/gain (budgeted)', 'SPED position loss/gain (budgeted)']
+    perc_cols = list(app.AGGREGATE_PERCENTAGES)
+    cuts = rows[['School Name'] + [col for pair in zip(number_cols, perc_cols) for col in pair]]
+    total = cuts.sum(numeric_only=True).to_dict()
+    total['School Name'] = 'TOTAL'
+    cuts = pd.concat([cuts, pd.DataFrame([total])], ignore_index=True)
+    for col in perc_cols:
+        cuts[col] = cuts[col].apply(lambda x: f"{x:.2%}" if pd.notna(x) else "")
+    for col in number_cols:
+        cuts[col] = cuts[col].apply(lambda x: f"{int(x):,}" if pd.notna(x) else "")
+    return cuts
+
+
+def bench(label, frame, legacy, vectorized, repeat):
+    assert legacy(frame) == vectorized(frame), f"{label}: output differs"
+    old = min(timeit.repeat(lambda: legacy(frame), number=1, repeat=repeat))
+    new = min(timeit.repeat(lambda: vectorized(frame), number=1, repeat=repeat))
+    print(f"{label:<42} {len(frame):>6} rows  iterrows {old * 1000:8.2f} ms  vectorized {new * 1000:7.2f} ms  {old / new:6.1f}x")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20, help="timing repetitions (best is reported)")
+    args = parser.parse_args(argv)
+
+    df, _ = app.load_snapshot(app.DATA_FILE)
+    index = app.build_geography_index(df)
+    kind, key = max(((kind, key) for kind in index for key in index[kind]), key=lambda item: len(index[item[0]][item[1]]))
+    name = " ".join(str(part) for part in key) if isinstance(key, tuple) else str(key)
+    views = {
+        f"largest geography ({name})": df.take(index[kind][key]),
+        "citywide (all schools)": df.drop_duplicates(subset=['School ID']),
+    }
+    for label, rows in views.items():
+        bench(f"capital, {label}", capital_frame(rows), legacy_html_table_capital, app.create_html_table_capital, args.repeat)
+        bench(f"cuts, {label}", cuts_frame(rows), legacy_html_table_cuts, app.create_html_table_cuts, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Measure how many element bytes a dashboard rerun sends to the browser
+
+Usage: python benchmarks/bench_rerun_payload.py [--rev REV ...]
+
+Runs app.py headlessly with Streamlit's AppTest, serializes every element
+the rerun produced and reports the total plus the share taken by <style>
+blocks (the dashboard stylesheet and the table styles), for the first run
+and for a district change.
+
+--rev also measures app.py as of a git revision, for before/after
+comparisons (e.g. --rev <commit>^ for the app before that commit). The old
+app.py is written next to the current one so it finds the dataset, and is
+removed afterwards.
+"""
+import argparse
+import os
+import subprocess
+import tempfile
+
+from streamlit.testing.v1 import AppTest
+
+APP_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+def iter_elements(node):
+    """Every element (leaf with a proto) below a node of the AppTest tree"""
+    children = getattr(node, "children", None)
+    if children:
+        for child in children.values():
+            yield from iter_elements(child)
+    elif getattr(node, "proto", None) is not None:
+        yield node
+
+
+def measure(at):
+    total = style = 0
+    for element in iter_elements(at._tree):
+        size = element.proto.ByteSize()
+        total += size
+        if element.type == "markdown" and "<style>" in element.value:
+            # Table markdown carries its own <style>; count only the dashboard stylesheet
+            if "<table" not in element.value:
+                style += size
+    return total, style
+
+
+def measure_app(app_file):
+    """(label, element bytes, stylesheet bytes) of the first run and of a district change"""
+    at = AppTest.from_file(app_file, default_timeout=120)
+    at.run()
+    results = [("first run", *measure(at))]
+    at.sidebar.selectbox[1].set_value(at.sidebar.selectbox[1].options[1]).run()
+    results.append(("district change", *measure(at)))
+    return results
+
+
+def measure_revision(rev):
+    """measure_app() of app.py as of a git revision"""
+    app_dir = os.path.dirname(APP_FILE)
+    source = subprocess.run(["git", "show", f"{rev}:app.py"], cwd=app_dir, check=True, capture_output=True).stdout
+    fd, app_file = tempfile.mkstemp(prefix=".bench_app_", suffix=".py", dir=app_dir)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(source)
+        return measure_app(app_file)
+    finally:
+        os.remove(app_file)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Element bytes of a dashboard rerun")
+    parser.add_argument("--rev", action="append", default=[], help="also measure app.py at this git revision (repeatable)")
+    args = parser.parse_args(argv)
+
+    apps = [(rev, lambda rev=rev: measure_revision(rev)) for rev in args.rev]
+    apps.append(("working tree", lambda: measure_app(APP_FILE)))
+    for name, run in apps:
+        print(name)
+        for label, total, style in run():
+            print(f"  {label:<16} {total:>8,} element bytes   stylesheet {style:>7,} bytes ({style / total:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""Measure dashboard rerun latency, memory and output size headlessly
+
+Usage: python benchmarks/bench_reruns.py [--limit N] [--output FILE]
+                                         [--baseline FILE] [--save-baseline] [--threshold PCT]
+
+Drives app.py through Streamlit's AppTest: every filter mode ("Chamber &
+District", "Legislator Name", "Ward", "Adler Name") over every option (or
+the first N with --limit), clicking both report buttons for each selection.
+Each rerun's latency and element bytes are recorded per step; the results
+file has percentiles per step and filter mode plus the peak resident memory.
+
+With --baseline the results are compared against a stored results file and
+the script exits with status 1 if any p50/p95 latency or mean output size
+grew by more than --threshold percent. --save-baseline writes the results to
+the baseline path (benchmarks/rerun_baseline.json by default) instead.
+
+Reports are rendered into a fresh temporary report cache, so every click
+measures a real render. If prebuilt_reports/ covers the dataset the report
+buttons are download buttons and are not clicked.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import numpy as np
+import streamlit
+from streamlit.testing.v1 import AppTest
+
+from bench_rerun_payload import APP_FILE, iter_elements
+
+sys.path.insert(0, os.path.dirname(APP_FILE))
+import app  # noqa: E402
+
+FILTER_MODES = ["Chamber & District", "Legislator Name", "Ward", "Adler Name"]
+REPORT_BUTTONS = {
+    "capital_report": "📋 Generate Capital Needs Report",
+    "cuts_report": "📋 Generate Budget Cuts Report",
+}
+PERCENTILES = (50, 90, 95, 99)
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rerun_baseline.json")
+
+
+class Recorder:
+    """Latency and element bytes of every rerun, grouped by step and filter mode"""
+
+    def __init__(self):
+        self.samples = []
+
+    def run(self, at, step, mode=None):
+        started = time.perf_counter()
+        at.run()
+        seconds = time.perf_counter() - started
+        if at.exception:
+            raise RuntimeError(f"{step} ({mode}) raised: {at.exception[0].value}")
+        size = sum(element.proto.ByteSize() for element in iter_elements(at._tree))
+        self.samples.append({"step": step, "mode": mode, "ms": seconds * 1000, "bytes": size})
+
+    def click_reports(self, at, mode):
+        for step, label in REPORT_BUTTONS.items():
+            buttons = [button for button in at.sidebar.button if button.label == label]
+            if buttons:
+                buttons[0].click()
+                self.run(at, step, mode)
+
+
+def walk_filter_modes(at, recorder, limit=None):
+    for mode in FILTER_MODES:
+        at.sidebar.radio[0].set_value(mode)
+        recorder.run(at, "filter_mode", mode)
+        if mode == "Chamber & District":
+            for chamber in at.sidebar.selectbox[0].options:
+                at.sidebar.selectbox[0].set_value(chamber)
+                recorder.run(at, "select", mode)
+                for district in at.sidebar.selectbox[1].options[:limit]:
+                    at.sidebar.selectbox[1].set_value(district)
+                    recorder.run(at, "select", mode)
+                    recorder.click_reports(at, mode)
+        else:
+            for option in at.sidebar.selectbox[0].options[:limit]:
+                at.sidebar.selectbox[0].set_value(option)
+                recorder.run(at, "select", mode)
+                recorder.click_reports(at, mode)
+
+
+def summarize(values):
+    values = np.asarray(values, dtype=float)
+    summary = {"count": len(values), "mean": float(values.mean()), "max": float(values.max())}
+    summary.update({f"p{q}": float(np.percentile(values, q)) for q in PERCENTILES})
+    return summary
+
+
+def summarize_samples(samples):
+    """{group: {"latency_ms": stats, "output_bytes": stats}} per step and per step/mode"""
+    groups = {}
+    for sample in samples:
+        keys = [sample["step"]]
+        if sample["mode"] is not None:
+            keys.append(f"{sample['step']}/{sample['mode']}")
+        for key in keys:
+            groups.setdefault(key, []).append(sample)
+    return {
+        key: {
+            "latency_ms": summarize([sample["ms"] for sample in group]),
+            "output_bytes": summarize([sample["bytes"] for sample in group]),
+        }
+        for key, group in sorted(groups.items())
+    }
+
+
+def peak_rss_bytes():
+    try:
+        import resource
+    except ImportError:
+        return app.process_rss_bytes()
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def run_benchmark(limit=None):
+    with tempfile.TemporaryDirectory() as cache_dir:
+        os.environ["CPS_REPORT_CACHE_DIR"] = cache_dir
+        recorder = Recorder()
+        at = AppTest.from_file(APP_FILE, default_timeout=300)
+        recorder.run(at, "first_run")
+        walk_filter_modes(at, recorder, limit)
+    return {
+        "meta": {
+            "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "dataset_hash": app.file_sha256(app.find_data_file()),
+            "python": platform.python_version(),
+            "streamlit": streamlit.__version__,
+            "platform": platform.platform(),
+            "limit": limit,
+        },
+        "reruns": len(recorder.samples),
+        "peak_rss_bytes": peak_rss_bytes(),
+        "steps": summarize_samples(recorder.samples),
+    }
+
+
+def compare(results, baseline, threshold):
+    """Print the change against a baseline per step; returns the regressions"""
+    regressions = []
+    print(f"{'step':<38} {'p50 ms':>16} {'p95 ms':>16} {'mean bytes':>22}")
+    for key, current in results["steps"].items():
+        previous = baseline["steps"].get(key)
+        if previous is None:
+            continue
+        cells = []
+        for metric, stat in [("latency_ms", "p50"), ("latency_ms", "p95"), ("output_bytes", "mean")]:
+            old, new = previous[metric][stat], current[metric][stat]
+            change = (new - old) / old * 100 if old else 0.0
+            if change > threshold:
+                regressions.append(f"{key} {metric} {stat}: {old:,.1f} -> {new:,.1f} ({change:+.0f}%)")
+            cells.append(f"{new:>9,.1f} {change:+5.0f}%")
+        print(f"{key:<38} " + " ".join(f"{cell:>16}" for cell in cells))
+    old_rss, new_rss = baseline.get("peak_rss_bytes"), results.get("peak_rss_bytes")
+    if old_rss and new_rss:
+        print(f"peak RSS {new_rss / 2**20:,.0f} MB (baseline {old_rss / 2**20:,.0f} MB)")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless rerun latency benchmark of the dashboard")
+    parser.add_argument("--limit", type=int, default=None, help="options per selectbox (default: all)")
+    parser.add_argument("--output", default=None, help="results JSON (default: print a summary only)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="stored results to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed growth in percent (default: 10)")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(args.limit)
+    for path in filter(None, [args.output, args.baseline if args.save_baseline else None]):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=1)
+        print(f"Wrote {path}")
+
+    if args.save_baseline or not os.path.exists(args.baseline):
+        for key, step in results["steps"].items():
+            latency = step["latency_ms"]
+            print(f"{key:<38} n={latency['count']:<4} p50 {latency['p50']:7.1f} ms  p95 {latency['p95']:7.1f} ms  "
+                  f"{step['output_bytes']['mean']:>10,.0f} bytes")
+        print(f"{results['reruns']} reruns, peak RSS {results['peak_rss_bytes'] / 2**20:,.0f} MB")
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
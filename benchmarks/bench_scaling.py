@@ -0,0 +1,86 @@
+"""Show how loading, filtering, totals and rendering scale with the number of schools
+
+Usage: python benchmarks/bench_scaling.py [--scales 1 10 100] [--repeat N]
+
+Scale 1 is the real CSV; other scales are generated with synthetic_dataset.py
+into a temporary directory. For each scale the script times the cold load (CSV
+parse plus Feather snapshot), the warm load (memory-mapped snapshot), building
+the shared dataset, and then for the largest geography: selecting its rows,
+looking up its totals, rendering the cuts HTML table, the whole view and the
+CSV export.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import timeit
+
+import pandas as pd
+
+from synthetic_dataset import generate_dataset, template_schools
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app  # noqa: E402
+
+FILTER_TYPES = {kind: filter_type for filter_type, kind in app.FILTER_KINDS.items()}
+
+
+def dataset_file(scale, data_dir):
+    """CSV of one scale: the real file for 1, a generated copy otherwise"""
+    if scale == 1:
+        path = os.path.join(data_dir, os.path.basename(app.DATA_FILE))
+        shutil.copyfile(app.DATA_FILE, path)
+        return path
+    schools = int(round(len(template_schools(pd.read_csv(app.DATA_FILE))) * scale))
+    path = os.path.join(data_dir, f"synthetic_{schools}.csv")
+    generate_dataset(schools, wards=max(50, int(5 * scale))).to_csv(path, index=False)
+    return path
+
+
+def timed(function, repeat=1):
+    """Best wall time of repeat calls, in milliseconds"""
+    return min(timeit.repeat(function, number=1, repeat=repeat)) * 1000
+
+
+def bench_scale(path, repeat):
+    results = {}
+    started = time.perf_counter()
+    df, sha256 = app.load_snapshot(path)
+    results["load (cold)"] = (time.perf_counter() - started) * 1000
+    results["load (warm)"] = timed(lambda: app.load_snapshot(path), repeat)
+    started = time.perf_counter()
+    dataset = app.build_dataset(df, sha256)
+    results["build dataset"] = (time.perf_counter() - started) * 1000
+
+    geo_kind, groups = "district", dataset["index"]["district"]
+    geo_key = max(groups, key=lambda key: len(groups[key]))
+    filter_type = FILTER_TYPES[geo_kind]
+    view = app.build_geography_view(dataset, filter_type, geo_key)
+    cuts_rows = dataset["display"].take(groups[geo_key])[app.CUTS_DISPLAY_COLUMNS]
+    results["select rows"] = timed(lambda: app.geography_positions(dataset, geo_kind, geo_key), repeat)
+    results["totals"] = timed(lambda: app.dataset_geography_totals(dataset, geo_kind, geo_key), repeat)
+    results["cuts HTML"] = timed(lambda: app.create_html_table_cuts(cuts_rows), repeat)
+    results["view"] = timed(lambda: app.build_geography_view(dataset, filter_type, geo_key), repeat)
+    results["CSV export"] = timed(lambda: app.geography_csv(dataset, geo_kind, geo_key), repeat)
+    meta = {"rows": len(df), "schools": len(dataset["schools"]["rows"]), "largest": view["schools"]}
+    return meta, results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scaling benchmark on synthetic datasets")
+    parser.add_argument("--scales", type=float, nargs="+", default=[1, 10, 100], help="multiples of the real school count")
+    parser.add_argument("--repeat", type=int, default=5, help="repeats of each timed step (best is reported)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        for scale in args.scales:
+            meta, results = bench_scale(dataset_file(scale, data_dir), args.repeat)
+            print(f"x{scale:g}: {meta['rows']:,} rows, {meta['schools']:,} schools, largest district {meta['largest']:,} schools")
+            for step, ms in results.items():
+                print(f"  {step:<14} {ms:>10,.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Generate a synthetic stacked dataset, schema-identical to the CPS CSV, at any scale
+
+Usage: python benchmarks/synthetic_dataset.py [--scale N | --schools N] [--house-districts N]
+                                              [--wards N] [--seed N] [--output FILE]
+
+Every synthetic school copies the data columns of a randomly drawn real school,
+so the NaN pattern and the relationships between columns are the real ones.
+Dollar columns are scaled by a per-school lognormal factor (the 7%/15% cut
+columns are recomputed from the scaled budget), position columns are kept.
+Schools get a ward, a House district correlated with the ward (so districts
+and wards overlap the way neighbouring geographies do) and the Senate district
+covering that House district (two House districts per Senate district, as in
+Illinois). Like the real file, every school has one IL House and one IL Senate
+row, House rows first.
+
+The output goes to synthetic_data/ by default, outside the directory the
+dashboard watches. Point the dashboard at it with
+CPS_DATA_DIR=synthetic_data CPS_DATA_PATTERN=<file name>, or pass it to the
+CLIs with --data.
+"""
+import argparse
+import math
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app  # noqa: E402
+
+DEFAULT_OUTPUT_DIR = os.path.join(os.path.dirname(app.DATA_FILE), "synthetic_data")
+
+# Columns scaled per school (dollars) and the cut columns recomputed from them
+DOLLAR_COLUMNS = ['Immediate Capital Needs', 'Total Capital Needs', 'Operational Budget FY25']
+CUT_COLUMNS = {
+    'Operations 7% Cut': ('Operational Budget FY25', 0.07),
+    'Operations 15% Cut': ('Operational Budget FY25', 0.15),
+}
+DOLLAR_SPREAD = 0.25
+
+
+def template_schools(df):
+    """One row per real school (its first IL House row) to draw synthetic schools from"""
+    house = df[df["Chamber"] == "IL House"]
+    return house.drop_duplicates(subset=["School ID"]).reset_index(drop=True)
+
+
+def generate_dataset(schools, house_districts=118, wards=50, seed=0, source=app.DATA_FILE):
+    """Stacked DataFrame with the source's columns: one House and one Senate row per synthetic school"""
+    rng = np.random.default_rng(seed)
+    templates = template_schools(pd.read_csv(source))
+    base = templates.take(rng.integers(len(templates), size=schools)).reset_index(drop=True)
+
+    # Identity columns: new IDs, names derived from the template's, School_ID blank where the template's is
+    school_ids = np.arange(700001, 700001 + schools)
+    base["School ID"] = school_ids
+    base["School Name"] = base["School Name"] + " #" + pd.Series(np.arange(1, schools + 1)).astype(str)
+    base["Unit ID"] = np.where(base["Unit ID"].isna(), np.nan, np.arange(100001, 100001 + schools))
+    base["School_ID"] = np.where(base["School_ID"].isna(), np.nan, school_ids)
+
+    factors = rng.lognormal(0.0, DOLLAR_SPREAD, size=schools)
+    for col in DOLLAR_COLUMNS:
+        base[col] = base[col] * factors
+    base[['Immediate Capital Needs', 'Total Capital Needs']] = (base[['Immediate Capital Needs', 'Total Capital Needs']] / 1e5).round() * 1e5
+    base['Operational Budget FY25'] = base['Operational Budget FY25'].round(2)
+    for cut_col, (base_col, rate) in CUT_COLUMNS.items():
+        base[cut_col] = base[base_col] * rate
+
+    # Geographies: ward, then a nearby House district, then its Senate district
+    ward = rng.integers(1, wards + 1, size=schools)
+    spread = max(1.0, house_districts / wards) * 1.5
+    centre = (ward - 0.5) * house_districts / wards
+    house = np.clip(np.floor(centre + rng.normal(0.0, spread, size=schools)), 0, house_districts - 1).astype(int) + 1
+    senate = (house + 1) // 2
+    base["Ward Number"] = ward
+    base["ward"] = ward
+    base["alderman"] = [f"Ward {w:03d}, Alder" for w in ward]
+
+    rows = []
+    for chamber, district, title in [("IL House", house, "Representative"), ("IL Senate", senate, "Senator")]:
+        chamber_rows = base.copy()
+        chamber_rows["Chamber"] = chamber
+        chamber_rows["District"] = district
+        chamber_rows["Legislator"] = [f"{chamber[3:]} {d:03d}, {title}" for d in district]
+        rows.append(chamber_rows.sort_values(["Ward Number", "District"], kind="stable"))
+    return pd.concat(rows, ignore_index=True)[templates.columns]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic stacked CPS budget stakes dataset")
+    size = parser.add_mutually_exclusive_group()
+    size.add_argument("--scale", type=float, default=10, help="multiple of the real school count (default: 10)")
+    size.add_argument("--schools", type=int, default=None, help="number of schools")
+    parser.add_argument("--house-districts", type=int, default=118, help="IL House districts (default: 118)")
+    parser.add_argument("--wards", type=int, default=None, help="wards (default: 50, or 5 per unit of scale above 10)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed (default: 0)")
+    parser.add_argument("--data", default=app.DATA_FILE, help="real dataset CSV to draw schools from")
+    parser.add_argument("--output", default=None, help="CSV to write (default: synthetic_data/...)")
+    args = parser.parse_args(argv)
+
+    real_schools = len(template_schools(pd.read_csv(args.data)))
+    schools = args.schools or int(round(real_schools * args.scale))
+    wards = args.wards or max(50, int(5 * schools / real_schools))
+    output = args.output or os.path.join(
+        DEFAULT_OUTPUT_DIR, f"cps_budget_stakes_dataset_synthetic_{schools}_schools.csv"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+
+    df = generate_dataset(schools, args.house_districts, wards, args.seed, args.data)
+    df.to_csv(output, index=False)
+    senate_districts = math.ceil(args.house_districts / 2)
+    print(f"Wrote {len(df):,} rows ({schools:,} schools, {args.house_districts} House / {senate_districts} Senate "
+          f"districts, {wards} wards) to {output}")
+
+
+if __name__ == "__main__":
+    main()
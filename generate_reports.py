@@ -0,0 +1,199 @@
+"""Write capital/cuts reports and CSV exports without the Streamlit dashboard
+
+Usage:
+    python generate_reports.py --all [--output-dir DIR] [--workers N]
+    python generate_reports.py --district "IL House:5" --ward 14 [--outputs capital csv]
+    python generate_reports.py --legislator "Ortiz, Aaron" --alderman "Hopkins, Brian"
+
+Geographies are selected the same way as in the sidebar: by chamber and
+district (CHAMBER:DISTRICT), legislator, ward or alder name. --all selects every
+geography of every filter mode, or only of the listed modes
+(e.g. --all district ward). Files get the dashboard's download names
+(<prefix>_capital_report.html, <prefix>_cuts_report.html, <prefix>_all_data.csv),
+so a legislator and their district produce one set of files.
+
+Reports go through the same on-disk report cache as the dashboard unless
+--no-cache is given; rendering runs across a process pool.
+"""
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import app
+
+OUTPUT_TYPES = (*app.REPORT_TYPES, "csv")
+
+# Sidebar filter mode of each selection option
+SELECTION_OPTIONS = {
+    "district": "Chamber & District",
+    "legislator": "Legislator Name",
+    "ward": "Ward",
+    "alderman": "Adler Name",
+}
+
+# Dataset and report cache directory of each worker process, set by the pool initializer
+_DATASET = None
+_CACHE_DIR = None
+
+
+def _init_worker(csv_path, cache_dir):
+    global _DATASET, _CACHE_DIR
+    df, sha256 = app.load_snapshot(csv_path)
+    _DATASET = app.build_dataset(df, sha256)
+    _CACHE_DIR = cache_dir
+
+
+def output_file_name(filename_prefix, output_type):
+    """Dashboard download name of one output"""
+    if output_type == "csv":
+        return f"{filename_prefix}_all_data.csv"
+    return f"{filename_prefix}_{output_type}_report.html"
+
+
+def render_output(dataset, output_type, filter_type, geo_key, cache_dir=None):
+    """Bytes of one report or CSV export; reports use the on-disk cache unless cache_dir is None"""
+    if output_type == "csv":
+        return app.geography_csv(dataset, app.FILTER_KINDS[filter_type], geo_key)
+    if cache_dir is None:
+        return app.build_report(dataset, output_type, filter_type, geo_key)
+    return app.cached_report(dataset, output_type, filter_type, geo_key, cache_dir)
+
+
+def _write_output(task, output_dir):
+    output_type, filter_type, geo_key, file_name = task
+    data = render_output(_DATASET, output_type, filter_type, geo_key, _CACHE_DIR)
+    path = os.path.join(output_dir, file_name)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return output_type, len(data)
+
+
+def resolve_geographies(dataset, selections):
+    """(filter mode, geography key) of each (kind, value) selection given on the command line
+
+    Values are matched against geography_id(), so "IL House:5" selects House
+    district 5 and "14" selects ward 14. Raises KeyError for unknown values.
+    """
+    ids = {
+        geo_kind: {app.geography_id(geo_kind, geo_key): geo_key for geo_key in keys}
+        for geo_kind, keys in dataset["index"].items()
+    }
+    resolved = []
+    for geo_kind, value in selections:
+        geo_key = ids[geo_kind].get(app.geography_id(geo_kind, value))
+        if geo_key is None:
+            raise KeyError(f"unknown {geo_kind}: {value!r}")
+        resolved.append((SELECTION_OPTIONS[geo_kind], geo_key))
+    return resolved
+
+
+def all_geographies(dataset, geo_kinds=tuple(SELECTION_OPTIONS)):
+    """(filter mode, geography key) of every geography of the given kinds"""
+    return [
+        (SELECTION_OPTIONS[geo_kind], geo_key)
+        for geo_kind in geo_kinds
+        for geo_key in dataset["index"][geo_kind]
+    ]
+
+
+def output_tasks(dataset, geographies, output_types=OUTPUT_TYPES):
+    """(output type, filter mode, geography key, file name) per distinct output file"""
+    tasks = {}
+    for filter_type, geo_key in geographies:
+        prefix = app.describe_geography(dataset["catalog"], filter_type, geo_key)["filename_prefix"]
+        for output_type in output_types:
+            file_name = output_file_name(prefix, output_type)
+            tasks.setdefault(file_name, (output_type, filter_type, geo_key, file_name))
+    return list(tasks.values())
+
+
+def generate_reports(geographies, output_dir, output_types=OUTPUT_TYPES, workers=None,
+                     csv_path=None, cache_dir=app.REPORT_CACHE_DIR, dataset=None, progress=None):
+    """Write every output of the given geographies across a process pool
+
+    csv_path defaults to the dataset the dashboard serves (the newest CSV in its
+    data directory). Returns (files written per output type, bytes written,
+    failures) where failures lists (file name, exception).
+    """
+    if csv_path is None:
+        csv_path = app.find_data_file()
+    if dataset is None:
+        df, sha256 = app.load_snapshot(csv_path)
+        dataset = app.build_dataset(df, sha256)
+    tasks = output_tasks(dataset, geographies, output_types)
+    os.makedirs(output_dir, exist_ok=True)
+
+    written, total_bytes, failures = Counter(), 0, []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(csv_path, cache_dir)) as pool:
+        futures = {pool.submit(_write_output, task, output_dir): task for task in tasks}
+        for done, future in enumerate(as_completed(futures), start=1):
+            file_name = futures[future][3]
+            try:
+                output_type, size = future.result()
+            except Exception as e:
+                failures.append((file_name, e))
+            else:
+                written[output_type] += 1
+                total_bytes += size
+            if progress is not None:
+                progress(done, len(tasks), file_name)
+    return written, total_bytes, failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write capital/cuts reports and CSV exports for any geography")
+    parser.add_argument("--all", nargs="*", choices=list(SELECTION_OPTIONS), metavar="KIND",
+                        help="every geography, optionally only of these kinds: %(choices)s")
+    parser.add_argument("--district", action="append", default=[], metavar="CHAMBER:DISTRICT",
+                        help='chamber and district, e.g. "IL House:5" (repeatable)')
+    parser.add_argument("--legislator", action="append", default=[], help="legislator name (repeatable)")
+    parser.add_argument("--ward", action="append", default=[], help="ward number (repeatable)")
+    parser.add_argument("--alderman", action="append", default=[], help="alder name (repeatable)")
+    parser.add_argument("--outputs", nargs="+", choices=OUTPUT_TYPES, default=list(OUTPUT_TYPES),
+                        help="what to write per geography (default: all)")
+    parser.add_argument("--output-dir", default="reports", help="where files go (default: ./reports)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--data", default=None, help="dataset CSV (default: the newest one in the dashboard's data directory)")
+    parser.add_argument("--no-cache", action="store_true", help="always re-render instead of using the report cache")
+    parser.add_argument("--quiet", action="store_true", help="only print the summary")
+    args = parser.parse_args(argv)
+
+    selections = [(geo_kind, value) for geo_kind in SELECTION_OPTIONS for value in getattr(args, geo_kind)]
+    if args.all is None and not selections:
+        parser.error("select geographies with --all, --district, --legislator, --ward or --alderman")
+
+    started = time.perf_counter()
+    args.data = args.data or app.find_data_file()
+    df, sha256 = app.load_snapshot(args.data)
+    dataset = app.build_dataset(df, sha256)
+    try:
+        geographies = resolve_geographies(dataset, selections)
+    except KeyError as e:
+        parser.error(e.args[0])
+    if args.all is not None:
+        geographies += all_geographies(dataset, args.all or tuple(SELECTION_OPTIONS))
+
+    def progress(done, total, file_name):
+        if not args.quiet:
+            print(f"  [{done}/{total}] {file_name}", file=sys.stderr)
+
+    written, total_bytes, failures = generate_reports(
+        geographies, args.output_dir, args.outputs, args.workers, args.data,
+        None if args.no_cache else app.REPORT_CACHE_DIR, dataset, progress,
+    )
+    counts = ", ".join(f"{written[output_type]} {output_type}" for output_type in args.outputs)
+    print(f"Wrote {sum(written.values())} files ({counts}; {total_bytes / 2**20:.1f} MiB) "
+          f"for dataset {sha256[:12]} into {args.output_dir} in {time.perf_counter() - started:.1f}s")
+    for file_name, error in failures:
+        print(f"  failed: {file_name}: {error!r}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""Pre-render the capital and cuts reports of every geography
+
+Usage: python prerender_reports.py [--output-dir DIR] [--workers N]
+
+Renders both great_tables reports for every Chamber & District, Legislator,
+Ward and Adler selection across a process pool. Each report is written once
+under its content hash (<sha256>.html) and manifest.json maps
+(report type, geography) to the file for the dataset version it was built
+from. Renders are deterministic, so a legislator's reports share files with
+their district's and an alder's with their ward's. Once the new manifest is
+in place, reports it no longer references are deleted. The dashboard serves
+these files directly instead of rendering on click, as long as the
+manifest's dataset hash matches the loaded data.
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import app
+
+# Dataset of each worker process, loaded once by the pool initializer
+_DATASET = None
+
+
+def _init_worker(csv_path):
+    global _DATASET
+    df, sha256 = app.load_snapshot(csv_path)
+    _DATASET = app.build_dataset(df, sha256)
+
+
+def _render(task):
+    report_type, filter_type, geo_key = task
+    html = app.build_report(_DATASET, report_type, filter_type, geo_key)
+    return report_type, app.geography_id(app.FILTER_KINDS[filter_type], geo_key), html
+
+
+def report_tasks(dataset, report_types=app.REPORT_TYPES):
+    """(report type, filter mode, geography key) for every report to render
+
+    Ad-hoc multi-geography selections are not pre-rendered.
+    """
+    return [
+        (report_type, filter_type, geo_key)
+        for filter_type, geo_kind in app.FILTER_KINDS.items() if geo_kind in dataset["index"]
+        for geo_key in dataset["index"][geo_kind]
+        for report_type in report_types
+    ]
+
+
+def write_content_addressed(output_dir, data, suffix=".html"):
+    """Write data under its sha256 (skipped if an identical file exists) and return the file name"""
+    file_name = hashlib.sha256(data).hexdigest() + suffix
+    path = os.path.join(output_dir, file_name)
+    if not os.path.exists(path):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    return file_name
+
+
+# Names write_content_addressed() gives report files; nothing else in the directory is pruned
+CONTENT_ADDRESSED_NAME = re.compile(r"[0-9a-f]{64}\.html")
+
+
+def remove_unreferenced(output_dir, manifest):
+    """Delete content-addressed report files the manifest does not reference; returns how many were deleted
+
+    Only <sha256>.html names are considered, so other files in the directory
+    (e.g. generate_reports.py output) are left alone.
+    """
+    referenced = {file_name for entries in manifest["reports"].values() for file_name in entries.values()}
+    removed = 0
+    for file_name in os.listdir(output_dir):
+        if CONTENT_ADDRESSED_NAME.fullmatch(file_name) and file_name not in referenced:
+            try:
+                os.remove(os.path.join(output_dir, file_name))
+            except OSError:
+                continue
+            removed += 1
+    return removed
+
+
+def prerender_reports(output_dir=app.PREBUILT_REPORTS_DIR, workers=None, csv_path=None,
+                      report_types=app.REPORT_TYPES, progress=None):
+    """Render every report across a process pool and write the manifest; returns the manifest
+
+    csv_path defaults to the dataset the dashboard serves (the newest CSV in its
+    data directory), so the manifest matches the hash the dashboard looks up.
+    """
+    if csv_path is None:
+        csv_path = app.find_data_file()
+    df, sha256 = app.load_snapshot(csv_path)
+    dataset = app.build_dataset(df, sha256)
+    tasks = report_tasks(dataset, report_types)
+    os.makedirs(output_dir, exist_ok=True)
+
+    reports = {report_type: {} for report_type in report_types}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(csv_path,)) as pool:
+        futures = [pool.submit(_render, task) for task in tasks]
+        for done, future in enumerate(as_completed(futures), start=1):
+            report_type, geo_id, html = future.result()
+            reports[report_type][geo_id] = write_content_addressed(output_dir, html)
+            if progress is not None:
+                progress(done, len(tasks))
+
+    manifest = {
+        "dataset_hash": sha256,
+        "dataset_file": os.path.basename(csv_path),
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "reports": reports,
+    }
+    manifest_path = os.path.join(output_dir, app.PREBUILT_MANIFEST)
+    with open(f"{manifest_path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(f"{manifest_path}.tmp", manifest_path)
+    remove_unreferenced(output_dir, manifest)
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-render the capital and cuts reports of every geography")
+    parser.add_argument("--output-dir", default=app.PREBUILT_REPORTS_DIR, help="where reports and manifest.json go")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--data", default=None, help="dataset CSV (default: the newest one in the dashboard's data directory)")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+
+    def progress(done, total):
+        if done == total or done % 50 == 0:
+            print(f"  {done}/{total} reports", file=sys.stderr)
+
+    manifest = prerender_reports(args.output_dir, args.workers, args.data, progress=progress)
+    count = sum(len(entries) for entries in manifest["reports"].values())
+    files = len({file_name for entries in manifest["reports"].values() for file_name in entries.values()})
+    print(f"Rendered {count} reports ({files} distinct files) for dataset {manifest['dataset_hash'][:12]} "
+          f"into {args.output_dir} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
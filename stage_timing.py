@@ -0,0 +1,104 @@
+"""Process-wide per-stage timing for app.py
+
+Each stage of a rerun (data load, geography filter, totals, cell formatting,
+HTML tables, CSV export, report generation, and the whole rerun) records its
+wall time here, per filter mode. Like startup_timing this module is imported
+once and outlives the reruns, so the record covers every session. Each
+(stage, mode) pair keeps the latest WINDOW samples, from which the histogram
+and percentiles are computed on demand.
+"""
+import bisect
+import json
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Stages in the order a rerun runs them
+STAGES = ("load", "filter", "totals", "format", "html", "csv", "report", "rerun")
+
+# Samples kept per (stage, mode)
+WINDOW = 500
+
+# Upper edges of the histogram buckets in milliseconds; the last bucket is open-ended
+BUCKET_EDGES_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Write one JSON line per sample to stderr; app.py sets this from CPS_STAGE_TIMING
+LOG = False
+
+_SAMPLES = {}
+_LOCK = threading.Lock()
+
+
+def bucket_labels():
+    """Label of each histogram bucket ("<1 ms", ..., "≥5000 ms")"""
+    return [f"<{edge:g} ms" for edge in BUCKET_EDGES_MS] + [f"≥{BUCKET_EDGES_MS[-1]:g} ms"]
+
+
+def record(stage, mode, seconds):
+    """Add one sample of a stage run under a filter mode (None if the stage has none)"""
+    ms = seconds * 1000
+    with _LOCK:
+        window = _SAMPLES.get((stage, mode))
+        if window is None:
+            window = _SAMPLES[(stage, mode)] = deque(maxlen=WINDOW)
+        window.append(ms)
+    if LOG:
+        print(json.dumps({"event": "stage", "stage": stage, "mode": mode, "ms": round(ms, 3)}), file=sys.stderr)
+
+
+@contextmanager
+def timer(stage, mode=None):
+    """Record the wall time of the block as one sample of stage under mode"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, mode, time.perf_counter() - started)
+
+
+def percentile(ordered, q):
+    """Nearest-rank percentile of an already sorted list"""
+    return ordered[min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))]
+
+
+def histogram(samples):
+    """Sample count per bucket of BUCKET_EDGES_MS"""
+    counts = [0] * (len(BUCKET_EDGES_MS) + 1)
+    for ms in samples:
+        counts[bisect.bisect_right(BUCKET_EDGES_MS, ms)] += 1
+    return counts
+
+
+def summary():
+    """Per stage and mode (mode "all" merges a stage's modes): count, mean, p50/p95, max and histogram"""
+    with _LOCK:
+        windows = {key: list(window) for key, window in _SAMPLES.items()}
+    groups = {}
+    for (stage, mode), samples in windows.items():
+        groups.setdefault((stage, "all"), []).extend(samples)
+        if mode is not None:
+            groups[(stage, mode)] = samples
+
+    rows = []
+    for (stage, mode), samples in groups.items():
+        ordered = sorted(samples)
+        rows.append({
+            "stage": stage,
+            "mode": mode,
+            "count": len(ordered),
+            "mean_ms": sum(ordered) / len(ordered),
+            "p50_ms": percentile(ordered, 50),
+            "p95_ms": percentile(ordered, 95),
+            "max_ms": ordered[-1],
+            "histogram": histogram(ordered),
+        })
+    order = {stage: i for i, stage in enumerate(STAGES)}
+    rows.sort(key=lambda row: (order.get(row["stage"], len(order)), row["mode"] != "all", row["mode"]))
+    return rows
+
+
+def reset():
+    with _LOCK:
+        _SAMPLES.clear()
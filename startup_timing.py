@@ -0,0 +1,42 @@
+"""Process-wide startup timing for app.py
+
+Streamlit re-executes app.py on every rerun, so the dashboard keeps its startup
+record in this separately imported module, which lives for the whole process.
+Only the first (cold) import of each module and the first completed render are
+recorded; reruns find everything already imported and change nothing.
+"""
+import time
+from contextlib import contextmanager
+
+# First import of this module, i.e. the start of the first script run
+STARTED = time.perf_counter()
+
+# Module -> seconds its first import took (including dependencies not loaded before it)
+IMPORT_SECONDS = {}
+
+FIRST_RENDER_SECONDS = None
+
+
+@contextmanager
+def timed_import(name):
+    """Record how long the imports in the block take, the first time name is timed"""
+    started = time.perf_counter()
+    yield
+    IMPORT_SECONDS.setdefault(name, time.perf_counter() - started)
+
+
+def record_first_render():
+    """Store the time from the first script start to the end of the first render; True the first time"""
+    global FIRST_RENDER_SECONDS
+    if FIRST_RENDER_SECONDS is not None:
+        return False
+    FIRST_RENDER_SECONDS = time.perf_counter() - STARTED
+    return True
+
+
+def timings():
+    """The startup record as plain data"""
+    return {
+        "imports": dict(IMPORT_SECONDS),
+        "first_render_seconds": FIRST_RENDER_SECONDS,
+    }